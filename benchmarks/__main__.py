@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import inspect
+import pathlib
+import platform
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from botup import codec
+
+from benchmarks.cases import cases, close, Case
+
+RESULTS_DIR = pathlib.Path(__file__).parent / 'results'
+
+
+def measure(loop: asyncio.AbstractEventLoop, case: Case, repeat: int, min_time: float) -> List[float]:
+    name, function, is_async = case
+
+    if is_async:
+        async def batch(number):
+            start = time.perf_counter()
+            for _ in range(number):
+                await function()
+            return time.perf_counter() - start
+
+        def run(number):
+            return loop.run_until_complete(batch(number))
+    else:
+        def run(number):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            return time.perf_counter() - start
+
+    number = 1
+    while run(number) < min_time:
+        number *= 2
+
+    return [run(number) / number for _ in range(repeat)]
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> int:
+    regressions = 0
+    print(f'\n{"case":<55} {"baseline":>12} {"current":>12} {"change":>8}')
+
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+
+        before = baseline[name]['median']
+        after = result['median']
+        change = (after - before) / before
+        marker = ''
+
+        if change > threshold:
+            marker = '  REGRESSION'
+            regressions += 1
+
+        print(f'{name:<55} {before * 1e6:>10.2f}us {after * 1e6:>10.2f}us {change:>+7.1%}{marker}')
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='botup hot path benchmarks')
+    parser.add_argument('-k', '--filter', default='', help='run only cases containing this substring')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimal seconds per measurement')
+    parser.add_argument('--save', metavar='NAME', help='store results as benchmarks/results/NAME.json')
+    parser.add_argument('--compare', metavar='NAME', help='compare with benchmarks/results/NAME.json')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as regression')
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    results: Dict[str, dict] = {}
+
+    try:
+        for case in cases(loop):
+            if args.filter not in case[0]:
+                continue
+
+            timings = measure(loop, case, args.repeat, args.min_time)
+            results[case[0]] = {'min': min(timings), 'median': statistics.median(timings)}
+            print(f'{case[0]:<55} {results[case[0]]["median"] * 1e6:>10.2f}us')
+    finally:
+        loop.run_until_complete(close())
+        loop.close()
+
+    if args.save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        (RESULTS_DIR / f'{args.save}.json').write_text(codec.dumps({
+            'python': sys.version,
+            'platform': platform.platform(),
+            'json_backend': codec.get_backend(),
+            'results': results
+        }))
+
+    if args.compare:
+        baseline = codec.loads((RESULTS_DIR / f'{args.compare}.json').read_text())['results']
+        return 1 if compare(results, baseline, args.threshold) else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import asyncio
+import re
+from typing import Any, Callable, Dict, List, Tuple, get_type_hints
+
+from botup.api import Api, _prepare_args
+from botup.bot import Bot
+from botup.dispatcher import Dispatcher
+from botup.state_manager.base import DictStateManager
+from botup.types import (
+    BaseContext,
+    BaseObject,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InputMediaPhoto,
+    MessageEntity,
+    Update
+)
+from botup.widget import Widget, Context
+
+from tests import utils
+
+Case = Tuple[str, Callable[[], Any], bool]
+
+
+def to_raw(value: Any) -> Any:
+    if isinstance(value, BaseObject):
+        value = value.as_dict()
+
+    if isinstance(value, dict):
+        return {('from' if k == 'from_' else k): to_raw(v) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [to_raw(v) for v in value]
+
+    return value
+
+
+def fixture_updates() -> Dict[str, dict]:
+    fixtures = {
+        'message_text': utils.message_update_by_text('hello'),
+        'message_command': utils.command_update_by_text('/start'),
+        'callback_query': utils.callback_update_by_data('data'),
+        'inline_query': utils.inline_query_update_by_query('query'),
+        'edited_message': utils.edited_message_update_by_text('hello')
+    }
+
+    for name in dir(utils):
+        if name.endswith('_update') and callable(getattr(utils, name)):
+            fixtures[name[:-len('_update')]] = getattr(utils, name)()
+
+    result = {}
+
+    for name, context in sorted(fixtures.items()):
+        raw = to_raw(context.update)
+
+        try:
+            Update.from_dict(raw)
+        except Exception:
+            continue
+
+        result[name] = raw
+
+    return result
+
+
+def big_keyboard(rows: int = 10, columns: int = 8) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text=f'{r}:{c}', callback_data=f'button {r} {c}') for c in range(columns)]
+        for r in range(rows)
+    ])
+
+
+async def _noop(ctx: BaseContext):
+    pass
+
+
+def small_dispatcher() -> Dispatcher:
+    dispatcher = Dispatcher()
+    dispatcher.register_command_handler('/start', _noop)
+    dispatcher.register_callback_handler('data', _noop)
+    dispatcher.register_message_handler(re.compile('.*'), _noop)
+    return dispatcher
+
+
+def large_dispatcher(size: int = 200) -> Dispatcher:
+    dispatcher = Dispatcher()
+
+    for n in range(size):
+        dispatcher.register_command_handler(f'/command_{n}', _noop)
+        dispatcher.register_callback_handler(f'callback_{n}', _noop)
+        dispatcher.register_callback_handler(re.compile(f'^pattern_{n} '), _noop)
+        dispatcher.register_message_handler(re.compile(f'^text_{n}$'), _noop)
+
+    dispatcher.register_command_handler('/start', _noop)
+    dispatcher.register_callback_handler('data', _noop)
+    dispatcher.register_message_handler(re.compile('.*'), _noop)
+    return dispatcher
+
+
+class BenchmarkChild(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_callback_handler('data', _noop)
+
+
+class BenchmarkRoot(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_command_handler('/start', self.cmd_start)
+        dispatcher.register_callback_handler('data', _noop)
+        dispatcher.register_message_handler(re.compile('.*'), _noop)
+
+    @staticmethod
+    async def cmd_start(ctx: Context):
+        await ctx.state_manager.set(ctx.chat_id, 'key', 'value')
+
+
+_bots: List[Bot] = []
+
+
+async def close():
+    for bot in _bots:
+        await bot.close_session()
+
+
+def cases(loop: asyncio.AbstractEventLoop) -> List[Case]:
+    result: List[Case] = []
+    updates = fixture_updates()
+
+    for name, raw in updates.items():
+        result.append((f'update_from_dict[{name}]', lambda raw=raw: Update.from_dict(raw), False))
+
+    for size_name, dispatcher in (('small', small_dispatcher()), ('large', large_dispatcher())):
+        for name in ('message_command', 'callback_query', 'message_text'):
+            result.append((
+                f'dispatcher_handle[{size_name}-{name}]',
+                lambda d=dispatcher, raw=updates[name]: d.handle(raw),
+                True
+            ))
+
+    async def create_bot() -> Bot:
+        return Bot(
+            token='token',
+            root=BenchmarkRoot('BenchmarkRoot', children=[BenchmarkChild('BenchmarkChild')]),
+            state_manager=DictStateManager()
+        )
+
+    bot = loop.run_until_complete(create_bot())
+    _bots.append(bot)
+
+    for name in ('message_command', 'callback_query', 'message_text'):
+        result.append((f'bot_handle[{name}]', lambda raw=updates[name]: bot.handle(raw), True))
+
+    keyboard = big_keyboard()
+    common_args = {
+        'send_message': {
+            'chat_id': utils.USER_ID,
+            'text': 'text',
+            'entities': [MessageEntity(type='bold', offset=0, length=4)],
+            'reply_markup': keyboard
+        },
+        'edit_message_reply_markup': {
+            'chat_id': utils.USER_ID,
+            'message_id': 1,
+            'reply_markup': keyboard
+        },
+        'send_media_group': {
+            'chat_id': utils.USER_ID,
+            'media': [InputMediaPhoto(media=f'file_{n}') for n in range(10)]
+        },
+        'answer_callback_query': {
+            'callback_query_id': '123'
+        }
+    }
+
+    for method, args in common_args.items():
+        method_hints = get_type_hints(getattr(Api, method))
+        data = {k: None for k in method_hints if k != 'return'}
+        data.update(args)
+        result.append((f'prepare_args[{method}]', lambda d=data, h=method_hints: _prepare_args(d, h), False))
+
+    for rows, columns in ((6, 7), (10, 8), (20, 8)):
+        markup = big_keyboard(rows, columns)
+        result.append((f'as_dict[keyboard-{rows}x{columns}]', markup.as_dict, False))
+
+    return result
@@ -0,0 +1,3 @@
+from botup.runner import main
+
+main()
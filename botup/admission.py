@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from botup.api import Api
+from botup.constants.update_type import UpdateType
+from botup.raw import get_chat_id, get_date, get_update_types
+from botup.utils import get_logger
+
+logger = get_logger()
+
+UpdateHandler = Callable[[dict], Awaitable[Any]]
+
+
+class AdmissionPolicy:
+
+    def __init__(
+            self,
+            max_age: Optional[Dict[UpdateType, float]] = None,
+            default_max_age: Optional[float] = None,
+            ack_callbacks: bool = True,
+            clock: Callable[[], float] = time.time
+    ):
+        self.max_age = max_age or {}
+        self.default_max_age = default_max_age
+        self.ack_callbacks = ack_callbacks
+        self.clock = clock
+        self.admitted = 0
+        self.dropped: Counter = Counter()
+
+    def get_max_age(self, update: dict) -> Optional[float]:
+        limits = [self.max_age[t] for t in get_update_types(update) if t in self.max_age]
+        return min(limits) if limits else self.default_max_age
+
+    def get_age(self, update: dict) -> Optional[float]:
+        date = get_date(update)
+        return None if date is None else self.clock() - date
+
+    def admit(self, update: dict, age: Optional[float] = None) -> bool:
+        if age is None:
+            age = self.get_age(update)
+
+        max_age = self.get_max_age(update) if age is not None else None
+
+        if max_age is None or age <= max_age:
+            self.admitted += 1
+            return True
+
+        for update_type in get_update_types(update) or ('unknown',):
+            self.dropped[update_type] += 1
+
+        return False
+
+    def reject(self, api: Api, update: dict):
+        callback_query = update.get('callback_query')
+
+        if self.ack_callbacks and callback_query is not None:
+            api.enqueue(api.answer_callback_query, callback_query_id=callback_query['id'])
+
+    def estimate_ages(self, updates: List[dict]) -> List[Optional[float]]:
+        # callbacks and queries carry no date, but they are at least as old as any later dated update
+        now = self.clock()
+        ages: List[Optional[float]] = []
+        later: Optional[float] = None
+
+        for update in reversed(updates):
+            date = get_date(update)
+            if date is not None:
+                later = now - date
+            ages.append(later)
+
+        ages.reverse()
+        return ages
+
+
+async def drain_updates(
+        api: Api,
+        handle: UpdateHandler,
+        policy: Optional[AdmissionPolicy] = None,
+        offset: Optional[int] = None,
+        limit: int = 100
+) -> Optional[int]:
+    policy = policy or AdmissionPolicy()
+
+    while True:
+        updates = await api.get_updates(offset=offset, limit=limit, timeout=0, decode=False)
+
+        if not updates:
+            return offset
+
+        offset = updates[-1]['update_id'] + 1
+        chats: Dict[Any, List[dict]] = {}
+
+        for update, age in zip(updates, policy.estimate_ages(updates)):
+            if policy.admit(update, age):
+                chats.setdefault(get_chat_id(update), []).append(update)
+            else:
+                policy.reject(api, update)
+
+        await asyncio.gather(*(_handle_chat(handle, chat_updates) for chat_updates in chats.values()))
+
+
+async def _handle_chat(handle: UpdateHandler, updates: List[dict]):
+    for update in updates:
+        try:
+            await handle(update)
+        except Exception:
+            logger.exception('Update handling failed')
@@ -1,7 +1,8 @@
 import io
-import json
+import time
 from typing import (
     Optional,
+    Dict,
     List,
     Union,
     Any,
@@ -13,9 +14,16 @@ from typing import (
 
 from aiohttp import ClientSession
 
+from botup import codec
+from botup.coalescing import EditCoalescer
 from botup.constants import api_method
 from botup.constants.chat_action import ChatAction
 from botup.constants.sticker_type import StickerType
+from botup.exceptions import ApiError
+from botup.instrumentation import Instrumentation, API
+from botup.outbox import Outbox, ApiCall, ErrorCallback
+from botup.policy import PolicyEngine, RequestPolicy
+from botup.tracing import get_tracer
 from botup.types import (
     Update,
     InputFile,
@@ -61,13 +69,36 @@ from botup.utils import get_logger
 
 logger = get_logger()
 
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_COALESCED_METHODS = (
+    api_method.EDIT_MESSAGE_TEXT,
+    api_method.EDIT_MESSAGE_CAPTION,
+    api_method.EDIT_MESSAGE_REPLY_MARKUP
+)
+
 
 class Api:
-    def __init__(self, token: str, timeout: int = 5):
+    def __init__(
+            self,
+            token: str,
+            timeout: int = 5,
+            queue_workers: int = 4,
+            on_queue_error: Optional[ErrorCallback] = None,
+            coalesce_edits: bool = False,
+            policy: Optional[PolicyEngine] = None,
+            instrumentation: Optional[Instrumentation] = None,
+            api_url: str = 'https://api.telegram.org',
+            session: Optional[ClientSession] = None
+    ):
         self.token = token
         self.timeout = timeout
-        self._url = f'https://api.telegram.org/bot{self.token}/'
-        self._session = ClientSession()
+        self._url = f'{api_url}/bot{self.token}/'
+        self._session = session or ClientSession()
+        self._owns_session = session is None
+        self._outbox = Outbox(queue_workers, on_queue_error)
+        self._coalescer = EditCoalescer() if coalesce_edits else None
+        self._policy = policy or PolicyEngine(RequestPolicy(timeout=timeout))
+        self.instrumentation = instrumentation
 
     async def __aenter__(self):
         return self
@@ -76,20 +107,93 @@ class Api:
         await self.close_session()
 
     async def close_session(self):
-        await self._session.close()
+        await self._outbox.close()
+
+        if self._owns_session:
+            await self._session.close()
+
+    def enqueue(self, function: ApiCall, **kwargs):
+        self._outbox.put(function, kwargs)
+
+    async def drain(self):
+        await self._outbox.drain()
 
     async def _request(self, method: api_method.ApiMethod, data: dict, hints: dict) -> Any:
+        with get_tracer().span('api.request', method=str(method)) as span:
+            try:
+                return await self._request_traced(method, data, hints)
+            except ApiError as e:
+                span.set_attribute('error_code', e.error_code)
+                raise
+
+    async def _request_traced(self, method: api_method.ApiMethod, data: dict, hints: dict) -> Any:
+        decode = data.pop('decode', True)
+        payload = _prepare_args(data, hints)
+
+        if _is_multipart_form_data(payload):
+            result = await self._post(method, _prepare_form_data(payload), replayable=False)
+        else:
+            body = codec.dumps(payload)
+
+            if self._coalescer and method in _COALESCED_METHODS and 'chat_id' in payload and 'message_id' in payload:
+                result = await self._coalescer.run(
+                    key=(payload['chat_id'], payload['message_id']),
+                    digest=hash((method, body)),
+                    send=lambda: self._post(method, body, _JSON_HEADERS)
+                )
+            else:
+                result = await self._post(method, body, _JSON_HEADERS)
+
+                if self._coalescer and method == api_method.DELETE_MESSAGE:
+                    self._coalescer.forget((payload['chat_id'], payload['message_id']))
+
+        if not decode:
+            return result
+
+        return self._response(result, hints['return'])
+
+    async def _post(
+            self,
+            method: api_method.ApiMethod,
+            data: Any,
+            headers: Optional[dict] = None,
+            replayable: bool = True
+    ) -> Any:
+
+        if self.instrumentation is None:
+            return await self._policy.execute(
+                method=method,
+                send=lambda timeout: self._send(method, data, headers, timeout),
+                replayable=replayable
+            )
+
+        start = time.perf_counter()
+
+        try:
+            return await self._policy.execute(
+                method=method,
+                send=lambda timeout: self._send(method, data, headers, timeout),
+                replayable=replayable
+            )
+        finally:
+            self.instrumentation.observe(API, method, time.perf_counter() - start)
+
+    async def _send(self, method: api_method.ApiMethod, data: Any, headers: Optional[dict], timeout: float) -> Any:
         response = await self._session.post(
             url=self._url + method,
-            data=_prepare_args(data, hints),
-            timeout=self.timeout
+            data=data,
+            headers=headers,
+            timeout=timeout
         )
-        response_data = await response.json()
+        response_data = codec.loads(await response.read())
 
         if not response_data['ok']:
-            raise Exception(response_data)
+            raise ApiError(response_data)
+
+        return response_data['result']
 
-        return self._response(response_data['result'], hints['return'])
+    def latency_snapshot(self) -> Dict[str, dict]:
+        return self._policy.snapshot()
 
     @staticmethod
     def _response(data: Any, hint: Type) -> Any:
@@ -116,7 +220,8 @@ class Api:
             offset: Optional[int] = None,
             limit: Optional[int] = None,
             timeout: Optional[int] = None,
-            allowed_updates: Optional[List[str]] = None
+            allowed_updates: Optional[List[str]] = None,
+            decode: bool = True
     ) -> List[Update]:
 
         return await self._request(
@@ -153,14 +258,14 @@ class Api:
             hints=get_type_hints(self.delete_webhook)
         )
 
-    async def get_webhook_info(self) -> WebhookInfo:
+    async def get_webhook_info(self, decode: bool = True) -> WebhookInfo:
         return await self._request(
             method=api_method.GET_WEBHOOK_INFO,
             data=locals(),
             hints=get_type_hints(self.get_webhook_info)
         )
 
-    async def get_me(self) -> User:
+    async def get_me(self, decode: bool = True) -> User:
         return await self._request(
             method=api_method.GET_ME,
             data=locals(),
@@ -192,7 +297,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -208,7 +314,8 @@ class Api:
             message_id: int,
             message_thread_id: Optional[int] = None,
             disable_notification: Optional[bool] = None,
-            protect_content: Optional[bool] = None
+            protect_content: Optional[bool] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -230,7 +337,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> MessageId:
 
         return await self._request(
@@ -252,7 +360,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -277,7 +386,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -300,7 +410,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -327,7 +438,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -353,7 +465,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -375,7 +488,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -396,7 +510,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -412,7 +527,8 @@ class Api:
             disable_notification: Optional[bool] = None,
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
-            allow_sending_without_reply: Optional[bool] = None
+            allow_sending_without_reply: Optional[bool] = None,
+            decode: bool = True
     ) -> List[Message]:
 
         return await self._request(
@@ -435,7 +551,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -454,7 +571,8 @@ class Api:
             horizontal_accuracy: Optional[float] = None,
             heading: Optional[int] = None,
             proximity_alert_radius: Optional[int] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -468,7 +586,8 @@ class Api:
             chat_id: Union[int, str, None] = None,
             message_id: Optional[int] = None,
             inline_message_id: Optional[str] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -493,7 +612,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -514,7 +634,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -543,14 +664,13 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
-        data = locals()
-        data['options'] = json.dumps(data['options'])
         return await self._request(
             method=api_method.SEND_POLL,
-            data=data,
+            data=locals(),
             hints=get_type_hints(self.send_poll)
         )
 
@@ -563,7 +683,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -589,7 +710,8 @@ class Api:
             self,
             user_id: int,
             offset: Optional[int] = None,
-            limit: Optional[int] = None
+            limit: Optional[int] = None,
+            decode: bool = True
     ) -> UserProfilePhotos:
 
         return await self._request(
@@ -600,7 +722,8 @@ class Api:
 
     async def get_file(
             self,
-            file_id: str
+            file_id: str,
+            decode: bool = True
     ) -> File:
 
         return await self._request(
@@ -740,7 +863,8 @@ class Api:
             name: Optional[str] = None,
             expire_date: Optional[int] = None,
             member_limit: Optional[int] = None,
-            creates_join_request: Optional[bool] = None
+            creates_join_request: Optional[bool] = None,
+            decode: bool = True
     ) -> ChatInviteLink:
 
         return await self._request(
@@ -756,7 +880,8 @@ class Api:
             name: Optional[str] = None,
             expire_date: Optional[int] = None,
             member_limit: Optional[int] = None,
-            creates_join_request: Optional[bool] = None
+            creates_join_request: Optional[bool] = None,
+            decode: bool = True
     ) -> ChatInviteLink:
 
         return await self._request(
@@ -768,7 +893,8 @@ class Api:
     async def revoke_chat_invite_link(
             self,
             chat_id: Union[int, str],
-            invite_link: str
+            invite_link: str,
+            decode: bool = True
     ) -> ChatInviteLink:
 
         return await self._request(
@@ -897,7 +1023,8 @@ class Api:
 
     async def get_chat(
             self,
-            chat_id: Union[int, str]
+            chat_id: Union[int, str],
+            decode: bool = True
     ) -> Chat:
 
         return await self._request(
@@ -908,7 +1035,8 @@ class Api:
 
     async def get_chat_administrators(
             self,
-            chat_id: Union[int, str]
+            chat_id: Union[int, str],
+            decode: bool = True
     ) -> List[ChatMember]:
 
         return await self._request(
@@ -931,7 +1059,8 @@ class Api:
     async def get_chat_member(
             self,
             chat_id: Union[int, str],
-            user_id: int
+            user_id: int,
+            decode: bool = True
     ) -> ChatMember:
 
         return await self._request(
@@ -964,7 +1093,8 @@ class Api:
         )
 
     async def get_forum_topic_icon_stickers(
-            self
+            self,
+            decode: bool = True
     ) -> List[Sticker]:
 
         return await self._request(
@@ -978,7 +1108,8 @@ class Api:
             chat_id: Union[int, str],
             name: str,
             icon_color: Optional[int] = None,
-            icon_custom_emoji_id: Optional[str] = None
+            icon_custom_emoji_id: Optional[str] = None,
+            decode: bool = True
     ) -> ForumTopic:
 
         return await self._request(
@@ -1148,7 +1279,8 @@ class Api:
     async def get_my_commands(
             self,
             scope: Optional[BotCommandScope] = None,
-            language_code: Optional[str] = None
+            language_code: Optional[str] = None,
+            decode: bool = True
     ) -> List[BotCommand]:
 
         return await self._request(
@@ -1171,7 +1303,8 @@ class Api:
 
     async def get_chat_menu_button(
             self,
-            chat_id: Optional[int] = None
+            chat_id: Optional[int] = None,
+            decode: bool = True
     ) -> MenuButton:
 
         return await self._request(
@@ -1194,7 +1327,8 @@ class Api:
 
     async def get_my_default_administrator_rights(
             self,
-            for_channels: Optional[bool] = None
+            for_channels: Optional[bool] = None,
+            decode: bool = True
     ) -> ChatAdministratorRights:
 
         return await self._request(
@@ -1212,7 +1346,8 @@ class Api:
             parse_mode: Optional[str] = None,
             entities: Optional[List[MessageEntity]] = None,
             disable_web_page_preview: Optional[bool] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -1229,7 +1364,8 @@ class Api:
             caption: Optional[str] = None,
             parse_mode: Optional[str] = None,
             caption_entities: Optional[List[MessageEntity]] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -1244,7 +1380,8 @@ class Api:
             chat_id: Union[int, str, None] = None,
             message_id: Optional[int] = None,
             inline_message_id: Optional[str] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -1258,7 +1395,8 @@ class Api:
             chat_id: Union[int, str, None] = None,
             message_id: Optional[int] = None,
             inline_message_id: Optional[str] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -1271,7 +1409,8 @@ class Api:
             self,
             chat_id: Union[int, str],
             message_id: int,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Poll:
 
         return await self._request(
@@ -1301,7 +1440,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[Keyboard] = None
+            reply_markup: Optional[Keyboard] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -1312,7 +1452,8 @@ class Api:
 
     async def get_sticker_set(
             self,
-            name: str
+            name: str,
+            decode: bool = True
     ) -> StickerSet:
 
         return await self._request(
@@ -1323,7 +1464,8 @@ class Api:
 
     async def get_custom_emoji_stickers(
             self,
-            custom_emoji_ids: List[str]
+            custom_emoji_ids: List[str],
+            decode: bool = True
     ) -> List[Sticker]:
 
         return await self._request(
@@ -1335,7 +1477,8 @@ class Api:
     async def upload_sticker_file(
             self,
             user_id: int,
-            png_sticker: InputFile
+            png_sticker: InputFile,
+            decode: bool = True
     ) -> File:
 
         return await self._request(
@@ -1436,7 +1579,8 @@ class Api:
     async def answer_web_app_query(
             self,
             web_app_query_id: str,
-            result: InlineQueryResult
+            result: InlineQueryResult,
+            decode: bool = True
     ) -> SentWebAppMessage:
 
         return await self._request(
@@ -1474,7 +1618,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -1561,7 +1706,8 @@ class Api:
             protect_content: Optional[bool] = None,
             reply_to_message_id: Optional[int] = None,
             allow_sending_without_reply: Optional[bool] = None,
-            reply_markup: Optional[InlineKeyboardMarkup] = None
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            decode: bool = True
     ) -> Message:
 
         return await self._request(
@@ -1578,7 +1724,8 @@ class Api:
             disable_edit_message: Optional[bool] = None,
             chat_id: Optional[int] = None,
             message_id: Optional[int] = None,
-            inline_message_id: Optional[str] = None
+            inline_message_id: Optional[str] = None,
+            decode: bool = True
     ) -> Union[Message, bool]:
 
         return await self._request(
@@ -1592,7 +1739,8 @@ class Api:
             user_id: int,
             chat_id: Optional[int] = None,
             message_id: Optional[int] = None,
-            inline_message_id: Optional[str] = None
+            inline_message_id: Optional[str] = None,
+            decode: bool = True
     ) -> List[GameHighScore]:
 
         return await self._request(
@@ -1610,10 +1758,16 @@ def _prepare_args(locals_args: dict, hints: dict) -> dict:
         if func:
             result[key] = func(value)
 
-    if _is_multipart_form_data(result):
-        for key, value in result.items():
-            if isinstance(value, (int, bool)):
-                result[key] = str(result[key])
+    return result
+
+
+def _prepare_form_data(data: dict) -> dict:
+    result = {}
+
+    for key, value in data.items():
+        if not isinstance(value, (str, io.BufferedReader)):
+            value = codec.dumps(value)
+        result[key] = value
 
     return result
 
@@ -1629,41 +1783,35 @@ def _prepare_input_file(value: InputFile) -> Any:
     return value.path.open('rb')
 
 
-def _prepare_json_dumps_list(value: List[BaseObject]) -> Any:
-    result = []
-
-    for v in value:
-        hints = get_type_hints(type(v))
-        result.append(_prepare_args(v.as_dict(), hints))
-
-    return json.dumps(result)
+def _prepare_object_list(value: List[BaseObject]) -> Any:
+    return [v.as_dict() for v in value]
 
 
-def _prepare_json_dumps(value: BaseObject) -> Any:
-    return json.dumps(value.as_dict())
+def _prepare_object(value: BaseObject) -> Any:
+    return value.as_dict()
 
 
 _prepare_arg_by_type = {
     InputFileStored: _prepare_input_file,
     InputFileUrl: _prepare_input_file,
     InputFilePath: _prepare_input_file,
-    InlineKeyboardMarkup: _prepare_json_dumps,
-    ChatPermissions: _prepare_json_dumps,
-    BotCommandScope: _prepare_json_dumps,
-    MenuButton: _prepare_json_dumps,
-    ChatAdministratorRights: _prepare_json_dumps,
-    MaskPosition: _prepare_json_dumps,
-    InlineQueryResult: _prepare_json_dumps
+    InlineKeyboardMarkup: _prepare_object,
+    ChatPermissions: _prepare_object,
+    BotCommandScope: _prepare_object,
+    MenuButton: _prepare_object,
+    ChatAdministratorRights: _prepare_object,
+    MaskPosition: _prepare_object,
+    InlineQueryResult: _prepare_object
 }
 
 _prepare_arg_by_list = {
-    Optional[List[MessageEntity]]: _prepare_json_dumps_list,
-    List[Union[InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo]]: _prepare_json_dumps_list,
-    List[BotCommand]: _prepare_json_dumps_list,
-    List[InlineQueryResult]: _prepare_json_dumps_list,
-    List[LabeledPrice]: _prepare_json_dumps_list,
-    Optional[List[ShippingOption]]: _prepare_json_dumps_list,
-    List[PassportElementError]: _prepare_json_dumps_list
+    Optional[List[MessageEntity]]: _prepare_object_list,
+    List[Union[InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo]]: _prepare_object_list,
+    List[BotCommand]: _prepare_object_list,
+    List[InlineQueryResult]: _prepare_object_list,
+    List[LabeledPrice]: _prepare_object_list,
+    Optional[List[ShippingOption]]: _prepare_object_list,
+    List[PassportElementError]: _prepare_object_list
 }
 
 
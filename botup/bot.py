@@ -1,8 +1,19 @@
+import asyncio
+import time
+from typing import Optional, Sequence
+
+from botup.admission import AdmissionPolicy
 from botup.api import Api
+from botup.dedup import Deduplicator
+from botup.instrumentation import Instrumentation, PARSE
 from botup.types import Update
-from botup.navigation import Navigation
-from botup.state_manager.base import StateManager, DictStateManager
+from botup.raw import get_context_chat_id, get_update_types
+from botup.tracing import get_tracer
+from botup.state_manager.base import StateManager, StateKey, DictStateManager
+from botup.state_manager.cached import CachedStateManager
+from botup.state_manager.unit_of_work import UnitOfWork
 from botup.widget import Widget, Context
+from botup.widget_tree import WidgetTree
 
 
 class Bot:
@@ -11,18 +22,129 @@ class Bot:
             self,
             token: str,
             root: Widget,
-            state_manager: StateManager = DictStateManager(),
-            api_timeout: int = 5
+            state_manager: Optional[StateManager] = None,
+            api_timeout: int = 5,
+            instrumentation: Optional[Instrumentation] = None,
+            api: Optional[Api] = None,
+            deduplicator: Optional[Deduplicator] = None,
+            admission: Optional[AdmissionPolicy] = None,
+            unit_of_work: bool = False,
+            username: Optional[str] = None
     ):
-        self._api = Api(token, api_timeout)
+        self.token = token
+        self._api = api or Api(token, api_timeout, instrumentation=instrumentation)
+        self._owns_api = api is None
         self._root = root
-        self._state_manager = state_manager
+        self._state_manager = state_manager or DictStateManager()
+        self.deduplicator = deduplicator
+        self.admission = admission
+        self.unit_of_work = unit_of_work
+        self.skipped = 0
+        self.tree = WidgetTree(root)
+        self.set_instrumentation(instrumentation)
+        self.set_username(username)
+
+    def set_instrumentation(self, instrumentation: Optional[Instrumentation]):
+        self.instrumentation = instrumentation
+
+        # a passed in api keeps its own instrumentation unless another one is given
+        if instrumentation is not None or self._owns_api:
+            self._api.instrumentation = instrumentation
+
+        for widget in self.tree:
+            widget.dispatcher.instrumentation = instrumentation
+
+    def set_username(self, username: Optional[str]):
+        self.username = username
+
+        # commands mentioning another bot are not dispatched
+        for widget in self.tree:
+            widget.dispatcher.bot_username = username
 
     async def close_session(self):
         await self._api.close_session()
 
     async def handle(self, update: dict):
-        update = Update.from_dict(update)
-        context = Context(update, self._api, self._root, self._state_manager)
-        navigation = await Navigation.of(context)
-        await navigation.current_widget.handle(context)
+        if self.deduplicator is None:
+            await self._handle(update)
+            return
+
+        update_id = update.get('update_id')
+
+        if await self.deduplicator.is_duplicate(update_id):
+            return
+
+        try:
+            await self._handle(update)
+        except Exception:
+            # the update may be delivered again and must not be dropped as a duplicate then
+            await self.deduplicator.forget(update_id)
+            raise
+
+    async def _handle(self, update: dict):
+        if self.admission is not None and not self.admission.admit(update):
+            self.admission.reject(self._api, update)
+            return
+
+        with get_tracer().span('bot.handle', update_id=update.get('update_id')) as span:
+            chat_id = get_context_chat_id(update)
+            update_types = get_update_types(update)
+            keys = self.tree.get_state_keys(update_types) if chat_id is not None else ()
+            state_manager = self._get_state_manager(keys)
+
+            with get_tracer().span('navigation.of') as navigation_span:
+                if keys:
+                    # the widget is not known before the path is read, so keys of every widget taking
+                    # this update go in the same round
+                    (path, version), _ = await asyncio.gather(
+                        self._state_manager.get_path_version(chat_id),
+                        state_manager.prefetch(chat_id, keys)
+                    )
+                else:
+                    path, version = await self._state_manager.get_path_version(chat_id)
+
+                navigation_span.set_attribute('path', path or '')
+
+            node = self.tree.paths.resolve(path or '')
+            widget = node.widget
+            span.set_attribute('chat_id', chat_id)
+            span.set_attribute('widget', widget.key)
+
+            if not widget.dispatcher.accepts(update_types):
+                self.skipped += 1
+                span.set_attribute('skipped', True)
+                return
+
+            update = self._decode(update)
+            context = Context(update, self._api, self._root, state_manager, node, version)
+
+            if not isinstance(state_manager, UnitOfWork):
+                await widget.handle(context)
+                return
+
+            try:
+                await widget.handle(context)
+            except Exception:
+                state_manager.rollback()
+                raise
+
+            await state_manager.commit()
+
+    def _get_state_manager(self, keys: Sequence[StateKey]) -> StateManager:
+        if self.unit_of_work:
+            return UnitOfWork(self._state_manager)
+
+        # only an update that gets a prefetch reads through the cache
+        if keys:
+            return CachedStateManager(self._state_manager)
+
+        return self._state_manager
+
+    def _decode(self, update: dict) -> Update:
+        if self.instrumentation is None:
+            return Update.from_dict(update)
+
+        start = time.perf_counter()
+        result = Update.from_dict(update)
+        self.instrumentation.observe(PARSE, 'update', time.perf_counter() - start)
+        return result
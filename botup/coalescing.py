@@ -0,0 +1,62 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Slot:
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.generation = 0
+        self.waiters = 0
+
+
+class EditCoalescer:
+
+    def __init__(self, max_size: int = 10000):
+        self._max_size = max_size
+        self._last: OrderedDict[Hashable, int] = OrderedDict()
+        self._slots: Dict[Hashable, _Slot] = {}
+        self.superseded = 0
+        self.not_modified = 0
+
+    async def run(self, key: Hashable, digest: int, send: Callable[[], Awaitable[Any]]) -> Any:
+        if self._last.get(key) == digest:
+            self.not_modified += 1
+            return True
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot()
+
+        slot.generation += 1
+        generation = slot.generation
+        slot.waiters += 1
+
+        try:
+            async with slot.lock:
+                if slot.generation != generation:
+                    self.superseded += 1
+                    return True
+
+                if self._last.get(key) == digest:
+                    self.not_modified += 1
+                    return True
+
+                result = await send()
+                self._remember(key, digest)
+                return result
+        finally:
+            slot.waiters -= 1
+            if not slot.waiters:
+                del self._slots[key]
+
+    def forget(self, key: Hashable):
+        self._last.pop(key, None)
+
+    def _remember(self, key: Hashable, digest: int):
+        self._last[key] = digest
+        self._last.move_to_end(key)
+
+        if len(self._last) > self._max_size:
+            self._last.popitem(last=False)
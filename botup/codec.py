@@ -0,0 +1,70 @@
+import json
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+__all__ = [
+    'dumps',
+    'loads',
+    'get_backend',
+    'set_backend'
+]
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+def _ujson_dumps(obj: Any) -> str:
+    return ujson.dumps(obj, ensure_ascii=False)
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+_backends = {
+    'json': (_json_dumps, json.loads)
+}
+
+if ujson is not None:
+    _backends['ujson'] = (_ujson_dumps, ujson.loads)
+
+if orjson is not None:
+    _backends['orjson'] = (_orjson_dumps, orjson.loads)
+
+_backend = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+_dumps: Callable[[Any], str]
+_loads: Callable[[Union[bytes, str]], Any]
+_dumps, _loads = _backends[_backend]
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str):
+    global _backend, _dumps, _loads
+
+    if name not in _backends:
+        raise ValueError(f'JSON backend "{name}" is not available')
+
+    _backend = name
+    _dumps, _loads = _backends[name]
+
+
+def dumps(obj: Any) -> str:
+    return _dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return _loads(data)
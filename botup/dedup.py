@@ -0,0 +1,63 @@
+from typing import Optional
+
+
+class Deduplicator:
+
+    def __init__(self):
+        self.duplicates = 0
+
+    async def is_duplicate(self, update_id: Optional[int]) -> bool:
+        return False
+
+    async def forget(self, update_id: Optional[int]):
+        pass
+
+
+class WindowDeduplicator(Deduplicator):
+
+    def __init__(self, size: int = 65536):
+        super().__init__()
+        assert size > 0 and size % 8 == 0
+        self.size = size
+        self._bits = bytearray(size // 8)
+        self._max: Optional[int] = None
+
+    def check(self, update_id: Optional[int]) -> bool:
+        if update_id is None:
+            return False
+
+        if self._max is None or update_id - self._max >= self.size:
+            # first update or a jump past the window, telegram may restart the sequence
+            self._bits = bytearray(self.size // 8)
+            self._max = update_id
+        elif update_id <= self._max - self.size:
+            # too old to be tracked, let it through without touching the window
+            return False
+        elif update_id > self._max:
+            for value in range(self._max + 1, update_id + 1):
+                self._clear(value)
+            self._max = update_id
+
+        index = update_id % self.size
+        mask = 1 << (index & 7)
+
+        if self._bits[index >> 3] & mask:
+            self.duplicates += 1
+            return True
+
+        self._bits[index >> 3] |= mask
+        return False
+
+    async def is_duplicate(self, update_id: Optional[int]) -> bool:
+        return self.check(update_id)
+
+    async def forget(self, update_id: Optional[int]):
+        self.uncheck(update_id)
+
+    def uncheck(self, update_id: Optional[int]):
+        if update_id is not None and self._max is not None and self._max - self.size < update_id <= self._max:
+            self._clear(update_id)
+
+    def _clear(self, value: int):
+        index = value % self.size
+        self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
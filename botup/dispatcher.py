@@ -1,4 +1,5 @@
-from typing import Callable, Pattern, Union, List
+import time
+from typing import Callable, Iterable, Pattern, Union, List, Optional, Tuple
 
 from botup.constants.update_type import (
     UpdateType,
@@ -70,15 +71,32 @@ from botup.handlers import (
     MessageVideoNoteHandler,
     MessageVoiceHandler
 )
+from botup.dedup import Deduplicator
+from botup.instrumentation import Instrumentation, PARSE, MIDDLEWARE, ROUTING, HANDLER, get_name
 from botup.types import Update, HandleFunction, MiddlewareFunction, BaseContext
 
 
+def claims_callback_answer(function: HandleFunction) -> HandleFunction:
+    function.claims_callback_answer = True
+    return function
+
+
 class Dispatcher:
 
-    def __init__(self):
+    def __init__(
+            self,
+            instrumentation: Optional[Instrumentation] = None,
+            deduplicator: Optional[Deduplicator] = None,
+            auto_answer_callbacks: bool = False,
+            bot_username: Optional[str] = None
+    ):
+        self.instrumentation = instrumentation
+        self.deduplicator = deduplicator
+        self.auto_answer_callbacks = auto_answer_callbacks
+        self._frozen = False
         self._middlewares: List[MiddlewareFunction] = list()
         self._update_types: List[UpdateType] = list()
-        self._message_command_handler = MessageCommandHandler()
+        self._message_command_handler = MessageCommandHandler(bot_username)
         self._callback_query_handler = CallbackQueryHandler()
         self._message_text_handler = MessageTextHandler()
         self._inline_query_handler = InlineQueryHandler()
@@ -255,169 +273,186 @@ class Dispatcher:
         self.register_voice_handler(handler)
         return handler
 
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    @property
+    def update_types(self) -> Tuple[UpdateType, ...]:
+        return tuple(self._update_types)
+
+    @property
+    def middlewares(self) -> Tuple[MiddlewareFunction, ...]:
+        return tuple(self._middlewares)
+
+    @property
+    def bot_username(self) -> Optional[str]:
+        return self._message_command_handler.bot_username
+
+    @bot_username.setter
+    def bot_username(self, bot_username: Optional[str]):
+        self._message_command_handler.bot_username = bot_username
+
+    def freeze(self):
+        if self._frozen:
+            return
+
+        self._update_types = tuple(self._update_types)
+        self._middlewares = tuple(self._middlewares)
+        self._frozen = True
+
+    def accepts(self, update_types: Iterable[UpdateType]) -> bool:
+        if self._middlewares:
+            return True
+        return any(update_type in self._update_types for update_type in update_types)
+
+    def handlers_count(self) -> int:
+        return sum(
+            getattr(self, f'_{update_type}_handler').count()
+            for update_type in self._update_types
+        )
+
+    def _add_update_type(self, update_type: UpdateType):
+        if self._frozen:
+            raise Exception('Dispatcher is frozen')  # TODO: specify exception
+
+        if update_type not in self._update_types:
+            self._update_types.append(update_type)
+
     def register_middleware(self, middleware: MiddlewareFunction):
+        if self._frozen:
+            raise Exception('Dispatcher is frozen')  # TODO: specify exception
+
         self._middlewares.append(middleware)
 
     def register_command_handler(self, command: Union[str, Pattern], handler: HandleFunction):
-        if MESSAGE_COMMAND not in self._update_types:
-            self._update_types.append(MESSAGE_COMMAND)
+        self._add_update_type(MESSAGE_COMMAND)
         if isinstance(command, str) and not command.startswith('/'):
             command = f'/{command}'
         self._message_command_handler.register(command, handler)
 
     def register_message_handler(self, message: Union[str, Pattern], handler: HandleFunction):
-        if MESSAGE_TEXT not in self._update_types:
-            self._update_types.append(MESSAGE_TEXT)
+        self._add_update_type(MESSAGE_TEXT)
         self._message_text_handler.register(message, handler)
 
     def register_callback_handler(self, callback: Union[str, Pattern], handler: HandleFunction):
-        if CALLBACK_QUERY not in self._update_types:
-            self._update_types.append(CALLBACK_QUERY)
+        self._add_update_type(CALLBACK_QUERY)
         self._callback_query_handler.register(callback, handler)
 
     def register_inline_handler(self, inline_query: Union[str, Pattern], handler: HandleFunction):
-        if INLINE_QUERY not in self._update_types:
-            self._update_types.append(INLINE_QUERY)
+        self._add_update_type(INLINE_QUERY)
         self._inline_query_handler.register(inline_query, handler)
 
     def register_channel_post_handler(self, handler: HandleFunction):
-        if CHANNEL_POST not in self._update_types:
-            self._update_types.append(CHANNEL_POST)
+        self._add_update_type(CHANNEL_POST)
         self._channel_post_handler.register(handler)
 
     def register_edited_message_handler(self, handler: HandleFunction):
-        if EDITED_MESSAGE not in self._update_types:
-            self._update_types.append(EDITED_MESSAGE)
+        self._add_update_type(EDITED_MESSAGE)
         self._edited_message_handler.register(handler)
 
     def register_edited_channel_post_handler(self, handler: HandleFunction):
-        if EDITED_CHANNEL_POST not in self._update_types:
-            self._update_types.append(EDITED_CHANNEL_POST)
+        self._add_update_type(EDITED_CHANNEL_POST)
         self._edited_channel_post_handler.register(handler)
 
     def register_chosen_inline_result_handler(self, handler: HandleFunction):
-        if CHOSEN_INLINE_RESULT not in self._update_types:
-            self._update_types.append(CHOSEN_INLINE_RESULT)
+        self._add_update_type(CHOSEN_INLINE_RESULT)
         self._chosen_inline_result_handler.register(handler)
 
     def register_shipping_query_handler(self, handler: HandleFunction):
-        if SHIPPING_QUERY not in self._update_types:
-            self._update_types.append(SHIPPING_QUERY)
+        self._add_update_type(SHIPPING_QUERY)
         self._shipping_query_handler.register(handler)
 
     def register_pre_checkout_query_handler(self, handler: HandleFunction):
-        if PRE_CHECKOUT_QUERY not in self._update_types:
-            self._update_types.append(PRE_CHECKOUT_QUERY)
+        self._add_update_type(PRE_CHECKOUT_QUERY)
         self._pre_checkout_query_handler.register(handler)
 
     def register_poll_handler(self, handler: HandleFunction):
-        if POLL not in self._update_types:
-            self._update_types.append(POLL)
+        self._add_update_type(POLL)
         self._poll_handler.register(handler)
 
     def register_message_poll_handler(self, handler: HandleFunction):
-        if MESSAGE_POLL not in self._update_types:
-            self._update_types.append(MESSAGE_POLL)
+        self._add_update_type(MESSAGE_POLL)
         self._message_poll_handler.register(handler)
 
     def register_poll_answer_handler(self, handler: HandleFunction):
-        if POLL_ANSWER not in self._update_types:
-            self._update_types.append(POLL_ANSWER)
+        self._add_update_type(POLL_ANSWER)
         self._poll_answer_handler.register(handler)
 
     def register_dice_handler(self, handler: HandleFunction):
-        if MESSAGE_DICE not in self._update_types:
-            self._update_types.append(MESSAGE_DICE)
+        self._add_update_type(MESSAGE_DICE)
         self._message_dice_handler.register(handler)
 
     def register_document_handler(self, handler: HandleFunction):
-        if MESSAGE_DOCUMENT not in self._update_types:
-            self._update_types.append(MESSAGE_DOCUMENT)
+        self._add_update_type(MESSAGE_DOCUMENT)
         self._message_document_handler.register(handler)
 
     def register_animation_handler(self, handler: HandleFunction):
-        if MESSAGE_ANIMATION not in self._update_types:
-            self._update_types.append(MESSAGE_ANIMATION)
+        self._add_update_type(MESSAGE_ANIMATION)
         self._message_animation_handler.register(handler)
 
     def register_audio_handler(self, handler: HandleFunction):
-        if MESSAGE_AUDIO not in self._update_types:
-            self._update_types.append(MESSAGE_AUDIO)
+        self._add_update_type(MESSAGE_AUDIO)
         self._message_audio_handler.register(handler)
 
     def register_contact_handler(self, handler: HandleFunction):
-        if MESSAGE_CONTACT not in self._update_types:
-            self._update_types.append(MESSAGE_CONTACT)
+        self._add_update_type(MESSAGE_CONTACT)
         self._message_contact_handler.register(handler)
 
     def register_game_handler(self, handler: HandleFunction):
-        if MESSAGE_GAME not in self._update_types:
-            self._update_types.append(MESSAGE_GAME)
+        self._add_update_type(MESSAGE_GAME)
         self._message_game_handler.register(handler)
 
     def register_invoice_handler(self, handler: HandleFunction):
-        if MESSAGE_INVOICE not in self._update_types:
-            self._update_types.append(MESSAGE_INVOICE)
+        self._add_update_type(MESSAGE_INVOICE)
         self._message_invoice_handler.register(handler)
 
     def register_left_chat_member_handler(self, handler: HandleFunction):
-        if MESSAGE_LEFT_CHAT_MEMBER not in self._update_types:
-            self._update_types.append(MESSAGE_LEFT_CHAT_MEMBER)
+        self._add_update_type(MESSAGE_LEFT_CHAT_MEMBER)
         self._message_left_chat_member_handler.register(handler)
 
     def register_location_handler(self, handler: HandleFunction):
-        if MESSAGE_LOCATION not in self._update_types:
-            self._update_types.append(MESSAGE_LOCATION)
+        self._add_update_type(MESSAGE_LOCATION)
         self._message_location_handler.register(handler)
 
     def register_new_chat_members_handler(self, handler: HandleFunction):
-        if MESSAGE_NEW_CHAT_MEMBERS not in self._update_types:
-            self._update_types.append(MESSAGE_NEW_CHAT_MEMBERS)
+        self._add_update_type(MESSAGE_NEW_CHAT_MEMBERS)
         self._message_new_chat_members_handler.register(handler)
 
     def register_new_chat_photo_handler(self, handler: HandleFunction):
-        if MESSAGE_NEW_CHAT_PHOTO not in self._update_types:
-            self._update_types.append(MESSAGE_NEW_CHAT_PHOTO)
+        self._add_update_type(MESSAGE_NEW_CHAT_PHOTO)
         self._message_new_chat_photo_handler.register(handler)
 
     def register_new_chat_title_handler(self, handler):
-        if MESSAGE_NEW_CHAT_TITLE not in self._update_types:
-            self._update_types.append(MESSAGE_NEW_CHAT_TITLE)
+        self._add_update_type(MESSAGE_NEW_CHAT_TITLE)
         self._message_new_chat_title_handler.register(handler)
 
     def register_photo_handler(self, handler: HandleFunction):
-        if MESSAGE_PHOTO not in self._update_types:
-            self._update_types.append(MESSAGE_PHOTO)
+        self._add_update_type(MESSAGE_PHOTO)
         self._message_photo_handler.register(handler)
 
     def register_sticker_handler(self, handler: HandleFunction):
-        if MESSAGE_STICKER not in self._update_types:
-            self._update_types.append(MESSAGE_STICKER)
+        self._add_update_type(MESSAGE_STICKER)
         self._message_sticker_handler.register(handler)
 
     def register_successful_payment_handler(self, handler: HandleFunction):
-        if MESSAGE_SUCCESSFUL_PAYMENT not in self._update_types:
-            self._update_types.append(MESSAGE_SUCCESSFUL_PAYMENT)
+        self._add_update_type(MESSAGE_SUCCESSFUL_PAYMENT)
         self._message_successful_payment_handler.register(handler)
 
     def register_venue_handler(self, handler: HandleFunction):
-        if MESSAGE_VENUE not in self._update_types:
-            self._update_types.append(MESSAGE_VENUE)
+        self._add_update_type(MESSAGE_VENUE)
         self._message_venue_handler.register(handler)
 
     def register_video_handler(self, handler: HandleFunction):
-        if MESSAGE_VIDEO not in self._update_types:
-            self._update_types.append(MESSAGE_VIDEO)
+        self._add_update_type(MESSAGE_VIDEO)
         self._message_video_handler.register(handler)
 
     def register_video_note_handler(self, handler: HandleFunction):
-        if MESSAGE_VIDEO_NOTE not in self._update_types:
-            self._update_types.append(MESSAGE_VIDEO_NOTE)
+        self._add_update_type(MESSAGE_VIDEO_NOTE)
         self._message_video_note_handler.register(handler)
 
     def register_voice_handler(self, handler: HandleFunction):
-        if MESSAGE_VOICE not in self._update_types:
-            self._update_types.append(MESSAGE_VOICE)
+        self._add_update_type(MESSAGE_VOICE)
         self._message_voice_handler.register(handler)
 
     async def _run_statements(self, context: BaseContext):
@@ -428,8 +463,49 @@ class Dispatcher:
             if getattr(context, statement_key):
                 handler: Handler = getattr(self, handler_key)
                 context.update_type = update_type
+
+                if update_type == CALLBACK_QUERY and self.auto_answer_callbacks:
+                    function = handler.resolve(context)
+                    if function:
+                        self._answer_early(context, function)
+                        await function(context)
+                    continue
+
                 await handler.handle(context)
 
+    async def _run_statements_instrumented(self, context: BaseContext):
+        instrumentation = self.instrumentation
+        start = time.perf_counter()
+
+        for update_type in self._update_types:
+            statement_key = f'is_{update_type}'
+            handler_key = f'_{update_type}_handler'
+
+            if getattr(context, statement_key):
+                handler: Handler = getattr(self, handler_key)
+                context.update_type = update_type
+                function = handler.resolve(context)
+
+                if not function:
+                    continue
+
+                if update_type == CALLBACK_QUERY and self.auto_answer_callbacks:
+                    self._answer_early(context, function)
+
+                handler_start = time.perf_counter()
+                instrumentation.observe(ROUTING, update_type, handler_start - start)
+
+                try:
+                    await function(context)
+                finally:
+                    start = time.perf_counter()
+                    instrumentation.observe(HANDLER, get_name(function), start - handler_start)
+
+    @staticmethod
+    def _answer_early(context: BaseContext, function: HandleFunction):
+        if not getattr(function, 'claims_callback_answer', False):
+            context.start_callback_answer()
+
     async def _run_middlewares(self, context: BaseContext) -> bool:
         for middleware in self._middlewares:
             if await middleware(context):
@@ -437,10 +513,52 @@ class Dispatcher:
 
         return False
 
+    async def _run_middlewares_instrumented(self, context: BaseContext) -> bool:
+        for middleware in self._middlewares:
+            start = time.perf_counter()
+
+            try:
+                if await middleware(context):
+                    return True
+            finally:
+                self.instrumentation.observe(MIDDLEWARE, get_name(middleware), time.perf_counter() - start)
+
+        return False
+
     async def handle(self, update: dict):
-        await self.handle_context(BaseContext(Update.from_dict(update)))
+        if self.deduplicator is None:
+            await self._handle(update)
+            return
+
+        update_id = update.get('update_id')
+
+        if await self.deduplicator.is_duplicate(update_id):
+            return
+
+        try:
+            await self._handle(update)
+        except Exception:
+            await self.deduplicator.forget(update_id)
+            raise
+
+    async def _handle(self, update: dict):
+        if self.instrumentation is None:
+            await self.handle_context(BaseContext(Update.from_dict(update)))
+            return
+
+        start = time.perf_counter()
+        context = BaseContext(Update.from_dict(update))
+        self.instrumentation.observe(PARSE, 'update', time.perf_counter() - start)
+        await self.handle_context(context)
 
     async def handle_context(self, context: BaseContext):
+        if self.instrumentation is not None:
+            if await self._run_middlewares_instrumented(context):
+                return
+
+            await self._run_statements_instrumented(context)
+            return
+
         if await self._run_middlewares(context):
             return
 
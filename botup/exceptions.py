@@ -1,2 +1,27 @@
+from typing import Optional
+
+
 class WidgetNotInRegistryError(Exception):
     pass
+
+
+class ApiError(Exception):
+
+    def __init__(self, response: dict):
+        super().__init__(response)
+        self.response = response
+        self.error_code: Optional[int] = response.get('error_code')
+        self.description: Optional[str] = response.get('description')
+        self.retry_after: Optional[int] = (response.get('parameters') or {}).get('retry_after')
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class WidgetTreeError(Exception):
+    pass
+
+
+class NavigationConflictError(Exception):
+    pass
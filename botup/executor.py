@@ -0,0 +1,134 @@
+import asyncio
+from collections import deque
+from itertools import count
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from botup.constants.update_type import (
+    UpdateType,
+    PRE_CHECKOUT_QUERY,
+    SHIPPING_QUERY,
+    CALLBACK_QUERY,
+    INLINE_QUERY,
+    CHOSEN_INLINE_RESULT,
+    MESSAGE_COMMAND,
+    CHANNEL_POST,
+    EDITED_MESSAGE,
+    EDITED_CHANNEL_POST,
+    POLL
+)
+from botup.raw import get_chat_id, get_update_types
+from botup.utils import get_logger
+
+logger = get_logger()
+
+UpdateHandler = Callable[[dict], Awaitable[Any]]
+
+_Item = Tuple[int, int, dict]
+
+DEFAULT_PRIORITIES: Dict[UpdateType, int] = {
+    PRE_CHECKOUT_QUERY: 0,
+    SHIPPING_QUERY: 0,
+    CALLBACK_QUERY: 1,
+    INLINE_QUERY: 1,
+    MESSAGE_COMMAND: 2,
+    CHOSEN_INLINE_RESULT: 3,
+    EDITED_MESSAGE: 4,
+    CHANNEL_POST: 4,
+    EDITED_CHANNEL_POST: 4,
+    POLL: 4
+}
+
+
+class UpdateExecutor:
+
+    def __init__(
+            self,
+            handle: UpdateHandler,
+            workers: int = 16,
+            priorities: Optional[Dict[UpdateType, int]] = None,
+            default_priority: int = 3
+    ):
+        assert workers > 0
+        self._handle = handle
+        self._workers = workers
+        self.priorities = DEFAULT_PRIORITIES if priorities is None else priorities
+        self.default_priority = default_priority
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        # updates of a chat wait here while its previous update is queued or running
+        self._chats: Dict[Any, Deque[_Item]] = {}
+        self._counter = count()
+
+    @property
+    def pending(self) -> int:
+        if not self._queue:
+            return 0
+        return self._queue.qsize() + sum(len(backlog) for backlog in self._chats.values())
+
+    def get_priority(self, update: dict) -> int:
+        priorities = [self.priorities[t] for t in get_update_types(update) if t in self.priorities]
+        return min(priorities) if priorities else self.default_priority
+
+    def submit(self, update: dict):
+        if not self._tasks:
+            self._start()
+
+        # the counter keeps fifo order inside one priority and never lets dicts be compared
+        item = (self.get_priority(update), next(self._counter), update)
+        chat_id = get_chat_id(update)
+
+        if chat_id is None:
+            self._queue.put_nowait(item)
+        elif chat_id in self._chats:
+            self._chats[chat_id].append(item)
+        else:
+            self._chats[chat_id] = deque()
+            self._queue.put_nowait(item)
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.join()
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._chats.clear()
+        self._queue = None
+
+    def _start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self._workers)]
+
+    async def _worker(self):
+        while True:
+            _, _, update = await self._queue.get()
+
+            try:
+                await self._call(update)
+            finally:
+                self._release(update)
+                self._queue.task_done()
+
+    def _release(self, update: dict):
+        chat_id = get_chat_id(update)
+
+        if chat_id is None:
+            return
+
+        # only the head update of a chat is ever queued, so the next one goes in when it is done
+        backlog = self._chats[chat_id]
+        if backlog:
+            self._queue.put_nowait(backlog.popleft())
+        else:
+            del self._chats[chat_id]
+
+    async def _call(self, update: dict):
+        try:
+            await self._handle(update)
+        except Exception:
+            logger.exception('Update handling failed')
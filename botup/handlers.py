@@ -1,6 +1,32 @@
-from typing import Dict, Optional, Union, Pattern
+from typing import Dict, Optional, Union, Pattern, Tuple
 
-from botup.types import Update, HandleFunction, BaseContext
+from botup.constants.message_entity_type import BOT_COMMAND
+from botup.types import Update, Message, HandleFunction, BaseContext
+
+
+def parse_command(message: Message, bot_username: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    text = message.text
+
+    if not text or not text.startswith('/'):
+        return None, None
+
+    length = None
+    for entity in message.entities or ():
+        if entity.offset == 0 and entity.type == BOT_COMMAND:
+            length = entity.length
+            break
+
+    if length is None:
+        length = len(text.split(maxsplit=1)[0])
+
+    # commands are ascii, so utf-16 entity offsets match str indexes here
+    command, _, mention = text[:length].partition('@')
+
+    # a command addressed to another bot in a group is not ours, without a known username any mention is accepted
+    if mention and bot_username is not None and mention.lower() != bot_username.lower():
+        return None, None
+
+    return command, text[length:].strip()
 
 
 class Handler:
@@ -13,36 +39,52 @@ class Handler:
     def get_chat_id(update: Update) -> Optional[int]:
         return None
 
-    async def handle(self, context: BaseContext):
+    def resolve(self, context: BaseContext) -> Optional[HandleFunction]:
         raise NotImplemented
 
+    def count(self) -> int:
+        return 0
+
+    async def handle(self, context: BaseContext):
+        handler = self.resolve(context)
+
+        if not handler:
+            return
+
+        await handler(context)
+
 
 class PatternHandler(Handler):
 
     def __init__(self):
         self._handlers: Dict[Union[str, Pattern], HandleFunction] = {}
+        self._patterns: Tuple[Tuple[Pattern, HandleFunction], ...] = ()
+
+    def count(self) -> int:
+        return len(self._handlers)
 
     def register(self, pattern: Union[str, Pattern], function: HandleFunction):
         self._handlers[pattern] = function
+        self._patterns = tuple((p, f) for p, f in self._handlers.items() if isinstance(p, Pattern))
 
-    async def handle(self, context: BaseContext):
+    def resolve(self, context: BaseContext) -> Optional[HandleFunction]:
         handler = self._get_handler(self.get_key(context.update))
 
         if not handler:
-            return
+            return None
 
         context.chat_id = self.get_chat_id(context.update)
         context.user_id = self.get_user_id(context.update)
 
-        await handler(context)
+        return handler
 
     def _get_handler(self, key: str) -> Optional[HandleFunction]:
         if key in self._handlers:
             return self._handlers[key]
 
-        for pattern in self._handlers.keys():
-            if isinstance(pattern, Pattern) and pattern.match(key):
-                return self._handlers[pattern]
+        for pattern, function in self._patterns:
+            if pattern.match(key):
+                return function
 
     @staticmethod
     def get_key(update: Update) -> str:
@@ -54,17 +96,20 @@ class SimpleHandler(Handler):
     def __init__(self):
         self._handler: Optional[HandleFunction] = None
 
+    def count(self) -> int:
+        return 1 if self._handler else 0
+
     def register(self, function: HandleFunction):
         self._handler = function
 
-    async def handle(self, context: BaseContext):
+    def resolve(self, context: BaseContext) -> Optional[HandleFunction]:
         if not self._handler:
-            return
+            return None
 
         context.chat_id = self.get_chat_id(context.update)
         context.user_id = self.get_user_id(context.update)
 
-        await self._handler(context)
+        return self._handler
 
 
 class MessageAnimationHandler(SimpleHandler):
@@ -120,6 +165,29 @@ class ChosenInlineResultHandler(SimpleHandler):
 
 class MessageCommandHandler(PatternHandler):
 
+    def __init__(self, bot_username: Optional[str] = None):
+        super().__init__()
+        self.bot_username = bot_username
+
+    def resolve(self, context: BaseContext) -> Optional[HandleFunction]:
+        text = context.update.message.text
+        command, payload = parse_command(context.update.message, self.bot_username)
+
+        if command is None:
+            return None
+
+        handler = self._handlers.get(text) or self._handlers.get(command) or self._get_handler(text)
+
+        if not handler:
+            return None
+
+        context.chat_id = self.get_chat_id(context.update)
+        context.user_id = self.get_user_id(context.update)
+        context.command = command
+        context.command_payload = payload
+
+        return handler
+
     @staticmethod
     def get_key(update: Update) -> str:
         return update.message.text
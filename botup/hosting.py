@@ -0,0 +1,80 @@
+from typing import Dict, Iterator, Optional
+
+from aiohttp import ClientSession, web
+
+from botup import codec
+from botup.api import Api
+from botup.bot import Bot
+from botup.utils import get_logger
+from botup.widget import Widget
+
+logger = get_logger()
+
+
+class BotHost:
+
+    def __init__(self, session: Optional[ClientSession] = None):
+        self._session = session
+        self._owns_session = session is None
+        self._bots: Dict[str, Bot] = {}
+
+    @property
+    def session(self) -> ClientSession:
+        if self._session is None:
+            self._session = ClientSession()
+        return self._session
+
+    def __iter__(self) -> Iterator[Bot]:
+        return iter(self._bots.values())
+
+    def __len__(self) -> int:
+        return len(self._bots)
+
+    def add(self, bot: Bot) -> Bot:
+        if bot.token in self._bots:
+            raise Exception('Bot with this token is already hosted')  # TODO: specify exception
+        self._bots[bot.token] = bot
+        return bot
+
+    def create_bot(self, token: str, root: Widget, api_timeout: int = 5, **kwargs) -> Bot:
+        api = Api(token, api_timeout, instrumentation=kwargs.get('instrumentation'), session=self.session)
+        return self.add(Bot(token, root, api=api, **kwargs))
+
+    def get(self, token: str) -> Optional[Bot]:
+        return self._bots.get(token)
+
+    async def handle(self, token: str, update: dict) -> bool:
+        bot = self._bots.get(token)
+
+        if bot is None:
+            return False
+
+        await bot.handle(update)
+        return True
+
+    def application(self, path: str = '/{token}') -> web.Application:
+        app = web.Application()
+        app.router.add_post(path, self._webhook)
+        app.on_cleanup.append(lambda _: self.close())
+        return app
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        bot = self._bots.get(request.match_info['token'])
+
+        if bot is None:
+            raise web.HTTPNotFound()
+
+        try:
+            await bot.handle(codec.loads(await request.read()))
+        except Exception:
+            logger.exception('Update handling failed')
+
+        return web.Response()
+
+    async def close(self):
+        for bot in self._bots.values():
+            await bot.close_session()
+
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
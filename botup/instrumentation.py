@@ -0,0 +1,111 @@
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+PARSE = 'parse'
+MIDDLEWARE = 'middleware'
+ROUTING = 'routing'
+HANDLER = 'handler'
+API = 'api'
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_name(function) -> str:
+    return getattr(function, '__qualname__', None) or repr(function)
+
+
+class LatencyHistogram:
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other: 'LatencyHistogram'):
+        assert self.buckets == other.buckets
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class Instrumentation:
+
+    def observe(self, stage: str, name: str, seconds: float):
+        pass
+
+
+class MetricsCollector(Instrumentation):
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._buckets = buckets
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def observe(self, stage: str, name: str, seconds: float):
+        key = (stage, name)
+        histogram = self._histograms.get(key)
+
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram(self._buckets)
+
+        histogram.observe(seconds)
+
+    def reset(self):
+        self._histograms.clear()
+
+    def merge(self, other: 'MetricsCollector'):
+        for key, histogram in other._histograms.items():
+            own = self._histograms.get(key)
+
+            if own is None:
+                own = self._histograms[key] = LatencyHistogram(histogram.buckets)
+
+            own.merge(histogram)
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        result: Dict[str, Dict[str, dict]] = {}
+
+        for (stage, name), histogram in sorted(self._histograms.items()):
+            result.setdefault(stage, {})[name] = histogram.snapshot()
+
+        return result
+
+    def prometheus(self, prefix: str = 'botup') -> str:
+        lines = []
+        current_stage = None
+
+        for (stage, name), histogram in sorted(self._histograms.items()):
+            metric = f'{prefix}_{stage}_seconds'
+            label = f'name="{_escape(name)}"'
+
+            if stage != current_stage:
+                lines.append(f'# TYPE {metric} histogram')
+                current_stage = stage
+
+            for bound, count in histogram.snapshot()['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{{label},le="{le}"}} {count}')
+
+            lines.append(f'{metric}_sum{{{label}}} {histogram.sum}')
+            lines.append(f'{metric}_count{{{label}}} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
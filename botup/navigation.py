@@ -1,50 +1,79 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Any, Optional, Union
 
-from botup.exceptions import WidgetNotInRegistryError
-from botup.widget import WidgetRegistry, Widget, Context
+from botup.path_table import PathTable, PathNode
+from botup.tracing import get_tracer
+from botup.widget import Widget, Context
+
+_UNKNOWN: Any = object()
 
 
 class Navigation:
 
-    def __init__(self, context: Context, path: str):
-        path = path or context.root_widget.key
-        widget_registry = WidgetRegistry()
+    def __init__(self, context: Context, path: Union[str, PathNode], version: Optional[int] = _UNKNOWN):
         self._context = context
-
-        try:
-            self._stack: List[Widget] = [widget_registry.get(key) for key in path.split('/')]
-        except WidgetNotInRegistryError:
-            self._stack: List[Widget] = [context.root_widget]
+        self._node: PathNode = path if isinstance(path, PathNode) else PathTable.of(context.root_widget).resolve(path)
+        self._version = version
 
     @property
     def current_widget(self) -> Widget:
-        return self._stack[-1]
+        return self._node.widget
 
     @classmethod
     async def of(cls, context: Context) -> Navigation:
-        path = await context.get_path()
-        return Navigation(context, path)
+        if context.path_node is not None:
+            return Navigation(context, context.path_node, context.path_version)
+
+        with get_tracer().span('navigation.of') as span:
+            path, version = await context.get_path_version()
+            span.set_attribute('path', path)
+            return Navigation(context, path, version)
 
     async def push(self, key: str, **kwargs):
-        if not self.current_widget.is_children_by_key(key):
+        node = self._node.children.get(key)
+
+        if node is None:
             raise Exception(f'Key "{key}" is not children for current widget "{self.current_widget.key}"')  # TODO: specify exception
 
         if not self._context.chat_id:
             raise Exception("Can't resolve chat_id from current update")  # TODO: specify exception
 
-        self._stack.append(WidgetRegistry().get(key))
-        await self._context.state_manager.set_path(self._context.chat_id, self.path())
+        self._node = node
+        await self._set_path()
         await self.current_widget.entry(self._context, **kwargs)
 
     async def pop(self, **kwargs):
         if not self._context.chat_id:
             raise Exception("Can't resolve chat_id from current update")  # TODO: specify exception
 
-        self._stack.pop()
-        await self._context.state_manager.set_path(self._context.chat_id, self.path())
+        if self._node.parent is None:
+            raise Exception("Can't pop root widget")  # TODO: specify exception
+
+        self._node = self._node.parent
+        await self._set_path()
         await self.current_widget.entry(self._context, **kwargs)
 
+    async def _set_path(self):
+        with get_tracer().span('navigation.set_path', chat_id=self._context.chat_id, path=self._node.path):
+            if self._version is _UNKNOWN:
+                await self._context.state_manager.set_path(self._context.chat_id, self._node.id)
+                self._context.path_node = None
+                return
+
+            # navigations of one update share its version, so one reused after another push is still current
+            if self._context.path_node is not None:
+                self._version = self._context.path_version
+
+            self._version = await self._context.state_manager.transition(
+                self._context.chat_id,
+                self._node.id,
+                self._version
+            )
+            self._context.path_node, self._context.path_version = self._node, self._version
+
     def path(self) -> str:
-        return '/'.join((w.key for w in self._stack))
+        return self._node.path
+
+    def path_id(self) -> str:
+        return self._node.id
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+from itertools import count
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from botup.utils import get_logger
+
+logger = get_logger()
+
+ApiCall = Callable[..., Awaitable[Any]]
+ErrorCallback = Callable[[Exception, ApiCall, dict], Awaitable[None]]
+
+
+class Outbox:
+
+    def __init__(self, workers: int = 4, on_error: Optional[ErrorCallback] = None):
+        assert workers > 0
+        self._workers = workers
+        self._on_error = on_error
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._counter = count()
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def put(self, function: ApiCall, kwargs: dict):
+        if self._closed:
+            raise Exception('Outbox is closed')  # TODO: specify exception
+
+        if not self._tasks:
+            self._start()
+
+        # the call runs in the submitter's context, so its spans get the right parent
+        item = (function, kwargs, contextvars.copy_context())
+        self._queues[self._get_index(kwargs.get('chat_id'))].put_nowait(item)
+
+    async def drain(self):
+        await asyncio.gather(*(q.join() for q in self._queues))
+
+    async def close(self):
+        self._closed = True
+        await self.drain()
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queues.clear()
+
+    def _get_index(self, chat_id: Any) -> int:
+        if chat_id is None:
+            return next(self._counter) % self._workers
+        return hash(chat_id) % self._workers
+
+    def _start(self):
+        for _ in range(self._workers):
+            queue: asyncio.Queue[Tuple[ApiCall, dict, contextvars.Context]] = asyncio.Queue()
+            self._queues.append(queue)
+            # workers must not inherit the context of whoever queued the first call
+            self._tasks.append(contextvars.Context().run(asyncio.ensure_future, self._worker(queue)))
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            function, kwargs, context = await queue.get()
+
+            try:
+                await context.run(asyncio.ensure_future, function(**kwargs))
+            except Exception as e:
+                await self._handle_error(e, function, kwargs)
+            finally:
+                queue.task_done()
+
+    async def _handle_error(self, error: Exception, function: ApiCall, kwargs: dict):
+        if not self._on_error:
+            logger.exception(f'Queued call {getattr(function, "__name__", function)} failed', exc_info=error)
+            return
+
+        try:
+            await self._on_error(error, function, kwargs)
+        except Exception:
+            logger.exception('Outbox error callback failed')
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, Iterator, Optional, Tuple, TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+if TYPE_CHECKING:
+    from botup.widget import Widget
+
+
+class PathNode:
+    __slots__ = ('id', 'path', 'widgets', 'parent', 'children')
+
+    def __init__(self, path_id: str, path: str, widgets: Tuple[Widget, ...], parent: Optional[PathNode]):
+        self.id = path_id
+        self.path = path
+        self.widgets = widgets
+        self.parent = parent
+        self.children: Dict[str, PathNode] = {}
+
+    @property
+    def widget(self) -> Widget:
+        return self.widgets[-1]
+
+
+class PathTable:
+    ID_PREFIX = '~'
+
+    _tables: WeakKeyDictionary = WeakKeyDictionary()
+
+    def __init__(self, root: Widget, max_depth: int = 32):
+        self._by_id: Dict[str, PathNode] = {}
+        self._by_path: Dict[str, PathNode] = {}
+        self.root = self._add((root,), None)
+        self._build(self.root, max_depth)
+
+    @classmethod
+    def of(cls, root: Widget) -> PathTable:
+        table = cls._tables.get(root)
+
+        if table is None:
+            table = cls._tables[root] = cls(root)
+
+        return table
+
+    @classmethod
+    def make_id(cls, path: str) -> str:
+        return cls.ID_PREFIX + hashlib.blake2b(path.encode(), digest_size=6).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def nodes(self) -> Iterator[PathNode]:
+        return iter(self._by_id.values())
+
+    def resolve(self, stored: Optional[str]) -> PathNode:
+        if not stored:
+            return self.root
+
+        return self._by_id.get(stored) or self._by_path.get(stored) or self.root
+
+    def _add(self, widgets: Tuple[Widget, ...], parent: Optional[PathNode]) -> PathNode:
+        path = '/'.join(w.key for w in widgets)
+        node = PathNode(self.make_id(path), path, widgets, parent)
+
+        if node.id in self._by_id:
+            raise Exception(f'Path id collision for "{path}"')  # TODO: specify exception
+
+        self._by_id[node.id] = node
+        self._by_path[path] = node
+        return node
+
+    def _build(self, node: PathNode, max_depth: int):
+        if len(node.widgets) >= max_depth:
+            return
+
+        for child in node.widget.children:
+            if child in node.widgets:
+                continue
+
+            child_node = self._add(node.widgets + (child,), node)
+            node.children[child.key] = child_node
+            self._build(child_node, max_depth)
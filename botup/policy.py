@@ -0,0 +1,197 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiohttp import ClientConnectorError, ClientError
+
+from botup.constants import api_method
+from botup.constants.api_method import ApiMethod
+from botup.exceptions import ApiError, CircuitOpenError
+from botup.instrumentation import LatencyHistogram
+from botup.utils import get_logger
+
+logger = get_logger()
+
+Send = Callable[[float], Awaitable[Any]]
+
+IDEMPOTENT_METHODS = (
+    api_method.GET_WEBHOOK_INFO,
+    api_method.GET_ME,
+    api_method.GET_USER_PROFILE_PHOTOS,
+    api_method.GET_FILE,
+    api_method.GET_CHAT,
+    api_method.GET_CHAT_ADMINISTRATORS,
+    api_method.GET_CHAT_MEMBER_COUNT,
+    api_method.GET_CHAT_MEMBER,
+    api_method.GET_FORUM_TOPIC_ICON_STICKERS,
+    api_method.GET_MY_COMMANDS,
+    api_method.GET_CHAT_MENU_BUTTON,
+    api_method.GET_MY_DEFAULT_ADMINISTRATOR_RIGHTS,
+    api_method.GET_STICKER_SET,
+    api_method.GET_CUSTOM_EMOJI_STICKERS,
+    api_method.GET_GAME_HIGH_SCORES
+)
+
+HEDGED_METHODS = (
+    api_method.GET_CHAT,
+    api_method.GET_FILE
+)
+
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    timeout: float = 5
+    retries: int = 0
+    backoff: float = 0.25
+    max_backoff: float = 5
+    idempotent: bool = False
+    hedge_after: Optional[float] = None
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        return not self.is_open
+
+    def success(self):
+        self._failures = 0
+        self._opened_at = None
+
+    def failure(self):
+        self._failures += 1
+
+        if self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning('Api circuit breaker opened')
+            self._opened_at = time.monotonic()
+
+
+class PolicyEngine:
+
+    def __init__(
+            self,
+            default: RequestPolicy = RequestPolicy(),
+            policies: Optional[Dict[ApiMethod, RequestPolicy]] = None,
+            breaker: Optional[CircuitBreaker] = None
+    ):
+        self.default = default
+        self.policies = policies or {}
+        self.breaker = breaker
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    @classmethod
+    def recommended(cls, timeout: float = 5) -> 'PolicyEngine':
+        default = RequestPolicy(timeout=timeout, retries=1)
+        read = replace(default, retries=2, idempotent=True)
+        hedged = replace(read, hedge_after=timeout / 5)
+        policies = {method: read for method in IDEMPOTENT_METHODS}
+        policies.update({method: hedged for method in HEDGED_METHODS})
+        return cls(default, policies, CircuitBreaker())
+
+    def get_policy(self, method: ApiMethod) -> RequestPolicy:
+        return self.policies.get(method, self.default)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {method: histogram.snapshot() for method, histogram in self.histograms.items()}
+
+    async def execute(self, method: ApiMethod, send: Send, replayable: bool = True) -> Any:
+        policy = self.get_policy(method)
+        attempt = 0
+
+        if not replayable:
+            policy = replace(policy, retries=0, hedge_after=None)
+
+        while True:
+            if self.breaker and not self.breaker.allow():
+                raise CircuitOpenError(f'Circuit is open, {method} was not sent')
+
+            try:
+                result = await self._attempt(method, policy, send)
+            except Exception as e:
+                retryable, delay = self._classify(e, policy, attempt)
+
+                if self.breaker and _is_failure(e):
+                    self.breaker.failure()
+
+                if not retryable or attempt >= policy.retries:
+                    raise
+
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            if self.breaker:
+                self.breaker.success()
+
+            return result
+
+    async def _attempt(self, method: ApiMethod, policy: RequestPolicy, send: Send) -> Any:
+        start = time.perf_counter()
+
+        try:
+            if policy.hedge_after is not None and policy.idempotent:
+                return await self._hedged(policy, send)
+            return await send(policy.timeout)
+        finally:
+            histogram = self.histograms.get(method)
+            if histogram is None:
+                histogram = self.histograms[method] = LatencyHistogram()
+            histogram.observe(time.perf_counter() - start)
+
+    @staticmethod
+    async def _hedged(policy: RequestPolicy, send: Send) -> Any:
+        tasks = {asyncio.ensure_future(send(policy.timeout))}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=policy.hedge_after)
+            if not done:
+                tasks.add(asyncio.ensure_future(send(policy.timeout)))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _classify(error: Exception, policy: RequestPolicy, attempt: int) -> Tuple[bool, float]:
+        delay = random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** attempt))
+
+        if isinstance(error, ApiError):
+            if error.error_code == 429:
+                return True, error.retry_after or delay
+            return policy.idempotent and (error.error_code or 0) >= 500, delay
+
+        if isinstance(error, ClientConnectorError):
+            return True, delay
+
+        if isinstance(error, (ClientError, asyncio.TimeoutError)):
+            return policy.idempotent, delay
+
+        return False, delay
+
+
+def _is_failure(error: Exception) -> bool:
+    if isinstance(error, ApiError):
+        return (error.error_code or 0) >= 500
+    return isinstance(error, (ClientError, asyncio.TimeoutError))
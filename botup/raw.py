@@ -0,0 +1,142 @@
+from typing import List, Optional
+
+from botup.constants.update_type import (
+    UpdateType,
+    CALLBACK_QUERY,
+    INLINE_QUERY,
+    CHANNEL_POST,
+    EDITED_MESSAGE,
+    EDITED_CHANNEL_POST,
+    CHOSEN_INLINE_RESULT,
+    SHIPPING_QUERY,
+    PRE_CHECKOUT_QUERY,
+    POLL,
+    POLL_ANSWER,
+    MESSAGE_POLL,
+    MESSAGE_COMMAND,
+    MESSAGE_TEXT,
+    MESSAGE_DICE,
+    MESSAGE_DOCUMENT,
+    MESSAGE_ANIMATION,
+    MESSAGE_AUDIO,
+    MESSAGE_CONTACT,
+    MESSAGE_GAME,
+    MESSAGE_INVOICE,
+    MESSAGE_LEFT_CHAT_MEMBER,
+    MESSAGE_LOCATION,
+    MESSAGE_NEW_CHAT_MEMBERS,
+    MESSAGE_NEW_CHAT_PHOTO,
+    MESSAGE_NEW_CHAT_TITLE,
+    MESSAGE_PHOTO,
+    MESSAGE_STICKER,
+    MESSAGE_SUCCESSFUL_PAYMENT,
+    MESSAGE_VENUE,
+    MESSAGE_VIDEO,
+    MESSAGE_VIDEO_NOTE,
+    MESSAGE_VOICE
+)
+
+_chat_keys = ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'my_chat_member', 'chat_member',
+              'chat_join_request')
+_user_keys = ('inline_query', 'chosen_inline_result', 'shipping_query', 'pre_checkout_query')
+
+_update_types = (
+    CALLBACK_QUERY,
+    INLINE_QUERY,
+    CHANNEL_POST,
+    EDITED_MESSAGE,
+    EDITED_CHANNEL_POST,
+    CHOSEN_INLINE_RESULT,
+    SHIPPING_QUERY,
+    PRE_CHECKOUT_QUERY,
+    POLL,
+    POLL_ANSWER
+)
+
+_message_types = (
+    ('dice', MESSAGE_DICE),
+    ('animation', MESSAGE_ANIMATION),
+    ('audio', MESSAGE_AUDIO),
+    ('contact', MESSAGE_CONTACT),
+    ('game', MESSAGE_GAME),
+    ('invoice', MESSAGE_INVOICE),
+    ('left_chat_member', MESSAGE_LEFT_CHAT_MEMBER),
+    ('location', MESSAGE_LOCATION),
+    ('new_chat_members', MESSAGE_NEW_CHAT_MEMBERS),
+    ('new_chat_photo', MESSAGE_NEW_CHAT_PHOTO),
+    ('new_chat_title', MESSAGE_NEW_CHAT_TITLE),
+    ('photo', MESSAGE_PHOTO),
+    ('sticker', MESSAGE_STICKER),
+    ('successful_payment', MESSAGE_SUCCESSFUL_PAYMENT),
+    ('venue', MESSAGE_VENUE),
+    ('video', MESSAGE_VIDEO),
+    ('video_note', MESSAGE_VIDEO_NOTE),
+    ('voice', MESSAGE_VOICE),
+    ('poll', MESSAGE_POLL)
+)
+
+
+def get_date(update: dict) -> Optional[int]:
+    for key in _chat_keys:
+        value = update.get(key)
+        if value is not None:
+            return value.get('edit_date') or value.get('date')
+
+    return None
+
+
+def get_update_types(update: dict) -> List[UpdateType]:
+    result = [update_type for update_type in _update_types if update.get(update_type) is not None]
+    message = update.get('message')
+
+    if message is None:
+        return result
+
+    text = message.get('text')
+    if text is not None:
+        result.append(MESSAGE_COMMAND if text.startswith('/') else MESSAGE_TEXT)
+
+    if message.get('document') is not None and message.get('animation') is None:
+        result.append(MESSAGE_DOCUMENT)
+
+    result.extend(update_type for key, update_type in _message_types if message.get(key) is not None)
+    return result
+
+
+def get_context_chat_id(update: dict) -> Optional[int]:
+    message = update.get('message')
+    if message is not None:
+        return message['chat']['id']
+
+    callback_query = update.get('callback_query')
+    if callback_query is not None and callback_query.get('message') is not None:
+        return callback_query['message']['chat']['id']
+
+    inline_query = update.get('inline_query')
+    if inline_query is not None:
+        return inline_query['from']['id']
+
+    return None
+
+
+def get_chat_id(update: dict) -> Optional[int]:
+    for key in _chat_keys:
+        value = update.get(key)
+        if value is not None:
+            return value['chat']['id']
+
+    callback_query = update.get('callback_query')
+    if callback_query is not None:
+        message = callback_query.get('message')
+        return message['chat']['id'] if message else callback_query['from']['id']
+
+    for key in _user_keys:
+        value = update.get(key)
+        if value is not None:
+            return value['from']['id']
+
+    poll_answer = update.get('poll_answer')
+    if poll_answer is not None:
+        return poll_answer['user']['id']
+
+    return None
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from botup.dedup import Deduplicator, WindowDeduplicator
+from botup.state_manager.redis import get_client
+
+
+class RedisDeduplicator(Deduplicator):
+
+    def __init__(
+            self,
+            url: Optional[str] = None,
+            redis: Optional[Redis] = None,
+            prefix: str = 'botup:update:',
+            ttl: int = 3600,
+            local: Optional[WindowDeduplicator] = None
+    ):
+        super().__init__()
+        assert url or redis, 'url or redis is required'
+        self.url = url
+        self._redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        self.local = local if local is not None else WindowDeduplicator()
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis or get_client(self.url)
+
+    async def is_duplicate(self, update_id: Optional[int]) -> bool:
+        if update_id is None:
+            return False
+
+        if self.local.check(update_id):
+            self.duplicates += 1
+            return True
+
+        if await self.redis.set(f'{self.prefix}{update_id}', 1, nx=True, ex=self.ttl):
+            return False
+
+        self.duplicates += 1
+        return True
+
+    async def forget(self, update_id: Optional[int]):
+        if update_id is None:
+            return
+
+        self.local.uncheck(update_id)
+        await self.redis.delete(f'{self.prefix}{update_id}')
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import importlib
+import multiprocessing
+import queue
+import signal
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from aiohttp import web
+
+from botup import codec
+from botup.bot import Bot
+from botup.executor import UpdateExecutor
+from botup.instrumentation import MetricsCollector
+from botup.raw import get_chat_id
+from botup.utils import get_logger
+
+logger = get_logger()
+
+BotFactory = Callable[[], Bot]
+
+_STOP = None
+
+
+def load_factory(spec: str) -> BotFactory:
+    module_name, _, attribute = spec.partition(':')
+
+    if not module_name or not attribute:
+        raise Exception('Factory must be given as "module:attribute"')  # TODO: specify exception
+
+    factory = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        factory = getattr(factory, name)
+
+    return factory
+
+
+async def _serve_worker(
+        index: int,
+        factory: BotFactory,
+        updates: multiprocessing.Queue,
+        metrics: multiprocessing.Queue,
+        metrics_interval: float,
+        concurrency: int
+):
+    loop = asyncio.get_event_loop()
+    collector = MetricsCollector()
+    bot = factory()
+    bot.set_instrumentation(collector)
+    executor = UpdateExecutor(bot.handle, workers=concurrency)
+
+    async def report():
+        while True:
+            await asyncio.sleep(metrics_interval)
+            metrics.put((index, collector))
+
+    reporter = asyncio.ensure_future(report())
+
+    try:
+        while True:
+            item = await loop.run_in_executor(None, updates.get)
+
+            if item is _STOP:
+                break
+
+            executor.submit(codec.loads(item))
+
+        await executor.close()
+    finally:
+        reporter.cancel()
+        metrics.put((index, collector))
+        await bot.close_session()
+
+
+def _run_worker(
+        index: int,
+        factory: BotFactory,
+        updates: multiprocessing.Queue,
+        metrics: multiprocessing.Queue,
+        metrics_interval: float,
+        concurrency: int
+):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_worker(index, factory, updates, metrics, metrics_interval, concurrency))
+
+
+class Supervisor:
+
+    def __init__(
+            self,
+            factory: Union[BotFactory, str],
+            workers: int = multiprocessing.cpu_count(),
+            path: str = '/',
+            secret_token: Optional[str] = None,
+            metrics_path: Optional[str] = '/metrics',
+            metrics_interval: float = 5,
+            concurrency: int = 16,
+            restart_delay: float = 1,
+            start_method: Optional[str] = None
+    ):
+        assert workers > 0
+        self.factory = load_factory(factory) if isinstance(factory, str) else factory
+        self.workers = workers
+        self.path = path
+        self.secret_token = secret_token
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.concurrency = concurrency
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self._context = multiprocessing.get_context(start_method)
+        self._metrics = self._context.Queue()
+        self._updates: List[multiprocessing.Queue] = []
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._collectors: Dict[int, MetricsCollector] = {}
+        self._retired = MetricsCollector()
+        self._counter = count()
+        self._monitor: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def get_index(self, chat_id: Any) -> int:
+        if chat_id is None:
+            return next(self._counter) % self.workers
+        return hash(chat_id) % self.workers
+
+    def dispatch(self, body: bytes, update: Optional[dict] = None):
+        if update is None:
+            update = codec.loads(body)
+
+        self._updates[self.get_index(get_chat_id(update))].put(body)
+
+    def metrics(self) -> MetricsCollector:
+        self._collect_metrics()
+        result = MetricsCollector()
+        result.merge(self._retired)
+
+        for collector in self._collectors.values():
+            result.merge(collector)
+
+        return result
+
+    def start(self):
+        for index in range(self.workers):
+            self._updates.append(self._context.Queue())
+            self._processes.append(None)
+            self._spawn(index)
+
+    def stop(self, timeout: float = 10):
+        self._stopping = True
+
+        for updates in self._updates:
+            updates.put(_STOP)
+
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f'Worker {process.pid} did not stop in time, terminating')
+                process.terminate()
+                process.join()
+
+        self._collect_metrics()
+
+    def check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process is None or process.is_alive() or self._stopping:
+                continue
+
+            logger.error(f'Worker {index} (pid {process.pid}) exited with code {process.exitcode}, restarting')
+            self._collect_metrics()
+            collector = self._collectors.pop(index, None)
+            if collector is not None:
+                self._retired.merge(collector)
+
+            # a killed worker may die holding the queue lock, so the replacement gets a fresh queue
+            self._updates[index] = self._context.Queue()
+            self.restarts += 1
+            self._spawn(index)
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self._webhook)
+
+        if self.metrics_path:
+            app.router.add_get(self.metrics_path, self._metrics_endpoint)
+
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    def run(self, host: str = '0.0.0.0', port: int = 8080):
+        web.run_app(self.application(), host=host, port=port)
+
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=_run_worker,
+            args=(index, self.factory, self._updates[index], self._metrics, self.metrics_interval, self.concurrency),
+            name=f'botup-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f'Started worker {index} (pid {process.pid})')
+
+    def _collect_metrics(self):
+        while True:
+            try:
+                index, collector = self._metrics.get_nowait()
+            except queue.Empty:
+                return
+            self._collectors[index] = collector
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.restart_delay)
+            self.check_workers()
+            self._collect_metrics()
+
+    async def _on_startup(self, _):
+        self.start()
+        self._monitor = asyncio.ensure_future(self._watch())
+
+    async def _on_cleanup(self, _):
+        if self._monitor is not None:
+            self._monitor.cancel()
+        await asyncio.get_event_loop().run_in_executor(None, self.stop)
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        if self.secret_token and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != self.secret_token:
+            raise web.HTTPForbidden()
+
+        body = await request.read()
+
+        try:
+            self.dispatch(body)
+        except Exception:
+            logger.exception('Update dispatching failed')
+
+        return web.Response()
+
+    async def _metrics_endpoint(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.metrics().prometheus(), content_type='text/plain')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m botup', description='Serve a bot webhook with several worker processes')
+    parser.add_argument('factory', help='bot factory as "module:attribute", called once in every worker')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--secret-token', default=None)
+    parser.add_argument('--metrics-path', default='/metrics')
+    parser.add_argument('--metrics-interval', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, default=16, help='updates handled at once by every worker')
+    args = parser.parse_args(argv)
+
+    supervisor = Supervisor(
+        args.factory,
+        workers=args.workers,
+        path=args.path,
+        secret_token=args.secret_token,
+        metrics_path=args.metrics_path or None,
+        metrics_interval=args.metrics_interval,
+        concurrency=args.concurrency
+    )
+    supervisor.run(args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
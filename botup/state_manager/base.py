@@ -1,13 +1,9 @@
-from typing import Optional, Dict
+import asyncio
+from typing import Optional, Dict, List, Sequence, Tuple
 
+from botup.exceptions import NavigationConflictError
 
-class Singleton(type):
-    _instances = {}
-
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+StateKey = Tuple[str, str]
 
 
 class StateManager:
@@ -27,8 +23,33 @@ class StateManager:
     async def delete(self, chat_id: int, key: str, section: str = 'botup-user'):
         raise NotImplementedError()
 
+    async def get_many(self, chat_id: int, keys: Sequence[StateKey]) -> List[Optional[str]]:
+        return list(await asyncio.gather(*(self.get(chat_id, key, section) for section, key in keys)))
+
+    async def apply(self, chat_id: int, values: Dict[StateKey, Optional[str]], path: Optional[str] = None):
+        await asyncio.gather(*(
+            self.set(chat_id, key, value, section) if value is not None else self.delete(chat_id, key, section)
+            for (section, key), value in values.items()
+        ))
+
+        if path is not None:
+            await self.set_path(chat_id, path)
+
+    async def get_path_version(self, chat_id: int) -> Tuple[Optional[str], Optional[int]]:
+        return await self.get_path(chat_id), None
+
+    async def transition(
+            self,
+            chat_id: int,
+            path: str,
+            version: Optional[int],
+            values: Optional[Dict[StateKey, Optional[str]]] = None
+    ) -> Optional[int]:
+        await self.apply(chat_id, values or {}, path)
+        return None
+
 
-class DictStateManager(StateManager, metaclass=Singleton):
+class DictStateManager(StateManager):
 
     def __init__(self):
         super().__init__()
@@ -45,6 +66,26 @@ class DictStateManager(StateManager, metaclass=Singleton):
     async def set_path(self, chat_id: int, path: str):
         user_dict = self._get_user_dict(chat_id, 'botup')
         user_dict['path'] = path
+        user_dict['path_version'] = user_dict.get('path_version', 0) + 1
+
+    async def get_path_version(self, chat_id: int) -> Tuple[Optional[str], Optional[int]]:
+        user_dict = self._get_user_dict(chat_id, 'botup')
+        return user_dict.get('path'), user_dict.get('path_version')
+
+    async def transition(
+            self,
+            chat_id: int,
+            path: str,
+            version: Optional[int],
+            values: Optional[Dict[StateKey, Optional[str]]] = None
+    ) -> Optional[int]:
+        user_dict = self._get_user_dict(chat_id, 'botup')
+
+        if user_dict.get('path_version') != version:
+            raise NavigationConflictError(f'Path of chat {chat_id} was changed concurrently')
+
+        await self.apply(chat_id, values or {}, path)
+        return user_dict['path_version']
 
     async def get(self, chat_id: int, key: str, section: str = 'botup-user') -> Optional[str]:
         user_dict = self._get_user_dict(chat_id, section)
@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from botup.state_manager.base import StateManager, StateKey
+
+
+class CachedStateManager(StateManager):
+
+    def __init__(self, state_manager: StateManager):
+        super().__init__()
+        self.state_manager = state_manager
+        self._values: Dict[Tuple[int, str, str], Optional[str]] = {}
+
+    def seed(self, chat_id: int, keys: Sequence[StateKey], values: Sequence[Optional[str]]):
+        for (section, key), value in zip(keys, values):
+            self._values.setdefault((chat_id, section, key), value)
+
+    async def prefetch(self, chat_id: int, keys: Sequence[StateKey]):
+        missing = [(section, key) for section, key in keys if (chat_id, section, key) not in self._values]
+
+        if missing:
+            self.seed(chat_id, missing, await self.state_manager.get_many(chat_id, missing))
+
+    async def get_path(self, chat_id: int) -> Optional[str]:
+        return await self.state_manager.get_path(chat_id)
+
+    async def set_path(self, chat_id: int, path: str):
+        await self.state_manager.set_path(chat_id, path)
+
+    async def get_path_version(self, chat_id: int) -> Tuple[Optional[str], Optional[int]]:
+        return await self.state_manager.get_path_version(chat_id)
+
+    async def transition(
+            self,
+            chat_id: int,
+            path: str,
+            version: Optional[int],
+            values: Optional[Dict[StateKey, Optional[str]]] = None
+    ) -> Optional[int]:
+        result = await self.state_manager.transition(chat_id, path, version, values)
+
+        for (section, key), value in (values or {}).items():
+            self._values[(chat_id, section, key)] = value
+
+        return result
+
+    async def get(self, chat_id: int, key: str, section: str = 'botup-user') -> Optional[str]:
+        cache_key = (chat_id, section, key)
+
+        if cache_key not in self._values:
+            self._values[cache_key] = await self.state_manager.get(chat_id, key, section)
+
+        return self._values[cache_key]
+
+    async def get_many(self, chat_id: int, keys: Sequence[StateKey]) -> List[Optional[str]]:
+        await self.prefetch(chat_id, keys)
+        return [self._values[(chat_id, section, key)] for section, key in keys]
+
+    async def set(self, chat_id: int, key: str, value: str, section: str = 'botup-user'):
+        await self.state_manager.set(chat_id, key, value, section)
+        self._values[(chat_id, section, key)] = value
+
+    async def delete(self, chat_id: int, key: str, section: str = 'botup-user'):
+        await self.state_manager.delete(chat_id, key, section)
+        self._values[(chat_id, section, key)] = None
+
+    async def apply(self, chat_id: int, values: Dict[StateKey, Optional[str]], path: Optional[str] = None):
+        await self.state_manager.apply(chat_id, values, path)
+
+        for (section, key), value in values.items():
+            self._values[(chat_id, section, key)] = value
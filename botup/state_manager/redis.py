@@ -1,27 +1,122 @@
-from typing import Optional
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
 
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 
-from botup.state_manager.base import Singleton, StateManager
+from botup.exceptions import NavigationConflictError
+from botup.state_manager.base import StateManager, StateKey
 
+# asyncio connections are bound to the loop that opened them, so clients are cached per loop
+_clients: 'WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Redis]]' = WeakKeyDictionary()
 
-class RedisStateManager(StateManager, metaclass=Singleton):
+# KEYS: path, path version, state keys. ARGV: expected version ('' if unset), path, 's:<value>' or 'd' per state key
+TRANSITION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return false
+end
+redis.call('SET', KEYS[1], ARGV[2])
+for i = 3, #KEYS do
+    if ARGV[i] == 'd' then
+        redis.call('DEL', KEYS[i])
+    else
+        redis.call('SET', KEYS[i], string.sub(ARGV[i], 3))
+    end
+end
+return redis.call('INCR', KEYS[2])
+"""
 
-    def __init__(self, url: str):
+
+def get_client(url: str) -> Redis:
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(url)
+
+    if client is None:
+        client = clients[url] = Redis.from_url(url, decode_responses=True)
+
+    return client
+
+
+class RedisStateManager(StateManager):
+
+    def __init__(self, url: Optional[str] = None, redis: Optional[Redis] = None, prefix: str = ''):
         super().__init__()
-        self.redis = Redis.from_url(url, decode_responses=True)
+        assert url or redis, 'url or redis is required'
+        self.url = url
+        self.prefix = prefix
+        self._redis = redis
+        self._transition: Optional[AsyncScript] = None
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis or get_client(self.url)
+
+    def _key(self, chat_id: int, key: str, section: str) -> str:
+        return f'{self.prefix}{section}:{chat_id}:{key}'
 
     async def get_path(self, chat_id: int) -> Optional[str]:
         return await self.get(chat_id, 'path', 'botup')
 
     async def set_path(self, chat_id: int, path: str):
-        await self.set(chat_id, 'path', path, 'botup')
+        await self.apply(chat_id, {}, path)
+
+    async def get_path_version(self, chat_id: int) -> Tuple[Optional[str], Optional[int]]:
+        path, version = await self.redis.mget(
+            self._key(chat_id, 'path', 'botup'),
+            self._key(chat_id, 'path_version', 'botup')
+        )
+        return path, None if version is None else int(version)
+
+    async def transition(
+            self,
+            chat_id: int,
+            path: str,
+            version: Optional[int],
+            values: Optional[Dict[StateKey, Optional[str]]] = None
+    ) -> Optional[int]:
+        values = values or {}
+        keys = [self._key(chat_id, 'path', 'botup'), self._key(chat_id, 'path_version', 'botup')]
+        args = ['' if version is None else str(version), path]
+
+        for (section, key), value in values.items():
+            keys.append(self._key(chat_id, key, section))
+            args.append('d' if value is None else f's:{value}')
+
+        if self._transition is None:
+            self._transition = self.redis.register_script(TRANSITION_SCRIPT)
+
+        result = await self._transition(keys=keys, args=args, client=self.redis)
+
+        if result is None:
+            raise NavigationConflictError(f'Path of chat {chat_id} was changed concurrently')
+
+        return int(result)
 
     async def get(self, chat_id: int, key: str, section: str = 'botup-user') -> Optional[str]:
-        return await self.redis.get(f'{section}:{chat_id}:{key}')
+        return await self.redis.get(self._key(chat_id, key, section))
 
     async def set(self, chat_id: int, key: str, value: str, section: str = 'botup-user'):
-        await self.redis.set(f'{section}:{chat_id}:{key}', value)
+        await self.redis.set(self._key(chat_id, key, section), value)
 
     async def delete(self, chat_id: int, key: str, section: str = 'botup-user'):
-        await self.redis.delete(f'{section}:{chat_id}:{key}')
+        await self.redis.delete(self._key(chat_id, key, section))
+
+    async def get_many(self, chat_id: int, keys: Sequence[StateKey]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        return await self.redis.mget([self._key(chat_id, key, section) for section, key in keys])
+
+    async def apply(self, chat_id: int, values: Dict[StateKey, Optional[str]], path: Optional[str] = None):
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            for (section, key), value in values.items():
+                if value is None:
+                    pipeline.delete(self._key(chat_id, key, section))
+                else:
+                    pipeline.set(self._key(chat_id, key, section), value)
+
+            if path is not None:
+                pipeline.set(self._key(chat_id, 'path', 'botup'), path)
+                pipeline.incr(self._key(chat_id, 'path_version', 'botup'))
+
+            await pipeline.execute()
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from botup.state_manager.base import StateManager, StateKey
+from botup.state_manager.cached import CachedStateManager
+
+
+class UnitOfWork(CachedStateManager):
+
+    def __init__(self, state_manager: StateManager):
+        super().__init__(state_manager)
+        self._dirty: Dict[int, Dict[StateKey, Optional[str]]] = {}
+        self._paths: Dict[int, str] = {}
+        self._versions: Dict[int, Optional[int]] = {}
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty or self._paths)
+
+    async def get_path(self, chat_id: int) -> Optional[str]:
+        if chat_id in self._paths:
+            return self._paths[chat_id]
+        return await self.state_manager.get_path(chat_id)
+
+    async def set_path(self, chat_id: int, path: str):
+        self._paths[chat_id] = path
+
+    async def get_path_version(self, chat_id: int) -> Tuple[Optional[str], Optional[int]]:
+        if chat_id in self._paths:
+            return self._paths[chat_id], None
+        return await self.state_manager.get_path_version(chat_id)
+
+    async def transition(
+            self,
+            chat_id: int,
+            path: str,
+            version: Optional[int],
+            values: Optional[Dict[StateKey, Optional[str]]] = None
+    ) -> Optional[int]:
+        # the version read before the first buffered transition is checked on commit
+        if chat_id not in self._paths:
+            self._versions[chat_id] = version
+
+        await self.apply(chat_id, values or {}, path)
+        return None
+
+    async def set(self, chat_id: int, key: str, value: str, section: str = 'botup-user'):
+        self._values[(chat_id, section, key)] = value
+        self._dirty.setdefault(chat_id, {})[(section, key)] = value
+
+    async def delete(self, chat_id: int, key: str, section: str = 'botup-user'):
+        self._values[(chat_id, section, key)] = None
+        self._dirty.setdefault(chat_id, {})[(section, key)] = None
+
+    async def apply(self, chat_id: int, values: Dict[StateKey, Optional[str]], path: Optional[str] = None):
+        for (section, key), value in values.items():
+            await (self.set(chat_id, key, value, section) if value is not None else self.delete(chat_id, key, section))
+
+        if path is not None:
+            await self.set_path(chat_id, path)
+
+    async def commit(self):
+        chats = set(self._dirty) | set(self._paths)
+        dirty, paths, versions = self._dirty, self._paths, self._versions
+        self._dirty, self._paths, self._versions = {}, {}, {}
+
+        await asyncio.gather(*(
+            self.state_manager.transition(chat_id, paths[chat_id], versions[chat_id], dirty.get(chat_id, {}))
+            if chat_id in versions else
+            self.state_manager.apply(chat_id, dirty.get(chat_id, {}), paths.get(chat_id))
+            for chat_id in chats
+        ))
+
+    def rollback(self):
+        self._values.clear()
+        self._dirty.clear()
+        self._paths.clear()
+        self._versions.clear()
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import socket
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+from aiohttp import web
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from botup import codec
+from botup.bot import Bot
+from botup.raw import get_chat_id
+from botup.state_manager.redis import get_client
+from botup.utils import get_logger
+
+logger = get_logger()
+
+FIELD = 'update'
+
+Entry = Tuple[str, dict]
+
+
+class _StreamClient:
+
+    def __init__(self, url: Optional[str], redis: Optional[Redis], stream: str, partitions: int):
+        assert url or redis, 'url or redis is required'
+        assert partitions > 0
+        self.url = url
+        self._redis = redis
+        self.stream = stream
+        self.partitions = partitions
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis or get_client(self.url)
+
+    def get_partition(self, update: dict) -> int:
+        chat_id = get_chat_id(update)
+        return hash(chat_id if chat_id is not None else update.get('update_id')) % self.partitions
+
+    def get_stream_name(self, partition: int) -> str:
+        return f'{self.stream}:{partition}'
+
+
+class StreamProducer(_StreamClient):
+
+    def __init__(
+            self,
+            url: Optional[str] = None,
+            redis: Optional[Redis] = None,
+            stream: str = 'botup:updates',
+            partitions: int = 16,
+            maxlen: Optional[int] = 100000
+    ):
+        super().__init__(url, redis, stream, partitions)
+        self.maxlen = maxlen
+
+    async def publish(self, body: Union[bytes, str], update: Optional[dict] = None) -> str:
+        if update is None:
+            update = codec.loads(body)
+
+        if isinstance(body, bytes):
+            body = body.decode()
+
+        name = self.get_stream_name(self.get_partition(update))
+        return await self.redis.xadd(name, {FIELD: body}, maxlen=self.maxlen, approximate=True)
+
+    def application(self, path: str = '/') -> web.Application:
+        app = web.Application()
+        app.router.add_post(path, self._webhook)
+        return app
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        await self.publish(await request.read())
+        return web.Response()
+
+
+class StreamConsumer(_StreamClient):
+
+    def __init__(
+            self,
+            bot: Bot,
+            url: Optional[str] = None,
+            redis: Optional[Redis] = None,
+            stream: str = 'botup:updates',
+            partitions: int = 16,
+            assigned: Optional[Iterable[int]] = None,
+            group: str = 'botup',
+            consumer: Optional[str] = None,
+            batch_size: int = 100,
+            block: int = 1000,
+            claim_idle: Optional[int] = 60000,
+            dead_letter: Optional[str] = None,
+            max_deliveries: int = 5
+    ):
+        super().__init__(url, redis, stream, partitions)
+        assert max_deliveries > 0
+        self.bot = bot
+        self.assigned = tuple(range(partitions) if assigned is None else assigned)
+        self.group = group
+        self.consumer = consumer or f'{socket.gethostname()}-{os.getpid()}'
+        self.batch_size = batch_size
+        self.block = block
+        self.claim_idle = claim_idle
+        self.dead_letter = dead_letter
+        self.max_deliveries = max_deliveries
+        self.processed = 0
+        self.failed = 0
+        self._running = False
+
+    @property
+    def streams(self) -> List[str]:
+        return [self.get_stream_name(partition) for partition in self.assigned]
+
+    async def setup(self):
+        for name in self.streams:
+            try:
+                await self.redis.xgroup_create(name, self.group, id='0', mkstream=True)
+            except ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    async def run(self):
+        await self.setup()
+        self._running = True
+
+        await self.recover()
+
+        while self._running:
+            if self.claim_idle is not None:
+                await self._claim()
+            await self._consume({name: '>' for name in self.streams}, self.block)
+
+    def stop(self):
+        self._running = False
+
+    async def recover(self):
+        # entries delivered to this consumer before a restart were never acked, walk them once
+        streams = {name: '0' for name in self.streams}
+
+        while streams:
+            response = await self._consume(streams)
+            streams = {name: entries[-1][0] for name, entries in response or () if entries}
+
+    async def _consume(self, streams: dict, block: Optional[int] = None) -> list:
+        response = await self.redis.xreadgroup(self.group, self.consumer, streams, count=self.batch_size, block=block)
+        await asyncio.gather(*(self._process(name, entries) for name, entries in response or ()))
+        return response
+
+    async def _claim(self):
+        for name in self.streams:
+            response = await self.redis.xautoclaim(
+                name, self.group, self.consumer, self.claim_idle, start_id='0-0', count=self.batch_size
+            )
+            if response[1]:
+                logger.warning(f'Claimed {len(response[1])} idle entries from {name}')
+                await self._process(name, response[1])
+
+    async def _process(self, name: str, entries: List[Entry]):
+        ids: List[Any] = []
+
+        # entries of one partition are handled one by one to keep per-chat order
+        for entry_id, fields in entries:
+            if not fields:
+                ids.append(entry_id)
+                continue
+
+            try:
+                await self.bot.handle(codec.loads(fields[FIELD]))
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception('Update handling failed')
+
+                # the entry stays pending and is claimed again later until it runs out of deliveries
+                if await self._get_deliveries(name, entry_id) < self.max_deliveries:
+                    continue
+
+                if self.dead_letter is None:
+                    logger.error(f'Dropping entry {entry_id} of {name} after {self.max_deliveries} deliveries')
+                else:
+                    await self.redis.xadd(self.dead_letter, {FIELD: fields[FIELD], 'stream': name, 'id': entry_id})
+
+            ids.append(entry_id)
+
+        if ids:
+            await self.redis.xack(name, self.group, *ids)
+
+    async def _get_deliveries(self, name: str, entry_id: Any) -> int:
+        pending = await self.redis.xpending_range(name, self.group, min=entry_id, max=entry_id, count=1)
+        return pending[0]['times_delivered'] if pending else 1
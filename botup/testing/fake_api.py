@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Union, get_args, get_origin, get_type_hints
+
+from aiohttp import web
+
+from botup import codec
+from botup.api import Api
+from botup.constants import api_method
+from botup.constants.api_method import ApiMethod
+from botup.types import BaseObject, ChatMember, Message, NoneType, Update, User
+from botup.utils import get_logger
+
+logger = get_logger()
+
+BOT_USER = {'id': 987654321, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}
+
+_api_function_names = {
+    api_method.LOGOUT: 'logout',
+    api_method.SET_GAME_HIGH_SCORE: 'set_game_score'
+}
+
+
+def _function_name(method: ApiMethod) -> str:
+    return _api_function_names.get(method) or re.sub(r'(?<!^)(?=[A-Z])', '_', method).lower()
+
+
+def _return_hints() -> Dict[str, Any]:
+    result = {}
+
+    for value in vars(api_method).values():
+        if isinstance(value, ApiMethod):
+            function = getattr(Api, _function_name(value), None)
+            result[str(value)] = get_type_hints(function)['return'] if function else bool
+
+    return result
+
+
+def _sample(hint: Any) -> Any:
+    origin = get_origin(hint)
+
+    if origin is Union:
+        return _sample([a for a in get_args(hint) if a is not NoneType][0])
+
+    if origin is list:
+        return []
+
+    if hint is User:
+        return dict(BOT_USER)
+
+    if hint is ChatMember:
+        return {'status': 'member', 'user': dict(BOT_USER)}
+
+    if dataclasses.is_dataclass(hint):
+        result = {}
+        for name, field_hint in get_type_hints(hint).items():
+            field = hint.__dataclass_fields__[name]
+            if NoneType in get_args(field_hint) or field.default is not dataclasses.MISSING:
+                continue
+            result['from' if name == 'from_' else name] = _sample(field_hint)
+        return result
+
+    if hint is bool:
+        return True
+
+    if hint in (int, float):
+        return hint(0)
+
+    if hint is str:
+        return 'fake'
+
+    return True
+
+
+class FakeTelegramServer:
+
+    def __init__(
+            self,
+            latency: float = 0,
+            jitter: float = 0,
+            error_rate: float = 0,
+            rate_limit_rate: float = 0,
+            retry_after: int = 1,
+            seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        self.requests: List[tuple] = []
+        self.record_requests = False
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._updates: List[dict] = []
+        self._hints = _return_hints()
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        app.router.add_get('/bot{token}/{method}', self._handle)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.application())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'FakeTelegramServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.stop()
+
+    def push_update(self, update: dict):
+        update.setdefault('update_id', next(self._update_ids))
+        self._updates.append(update)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = await self._read_params(request)
+        self.calls[method] += 1
+
+        if self.record_requests:
+            self.requests.append((method, params))
+
+        if method not in self._hints:
+            return self._error(404, 'Not Found')
+
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return self._error(429, f'Too Many Requests: retry after {self.retry_after}', self.retry_after)
+
+        if roll < self.rate_limit_rate + self.error_rate:
+            return self._error(500, 'Internal Server Error')
+
+        return web.Response(
+            body=codec.dumps({'ok': True, 'result': self.result(method, params)}),
+            content_type='application/json'
+        )
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> dict:
+        if request.content_type == 'application/json':
+            return codec.loads(await request.read())
+
+        params = {}
+        for key, value in (await request.post()).items():
+            if isinstance(value, str):
+                try:
+                    value = codec.loads(value)
+                except ValueError:
+                    pass
+            params[key] = value
+
+        return params
+
+    def result(self, method: str, params: dict) -> Any:
+        hint = self._hints[method]
+
+        if method == api_method.GET_UPDATES:
+            offset = params.get('offset') or 0
+            limit = params.get('limit') or 100
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            return self._updates[:limit]
+
+        if hint is Message or (get_origin(hint) is Union and Message in get_args(hint) and 'chat_id' in params):
+            return self._message(params)
+
+        if get_origin(hint) is list and get_args(hint)[0] is Message:
+            return [self._message(params) for _ in params.get('media') or [None]]
+
+        if get_origin(hint) is list and get_args(hint)[0] is Update:
+            return []
+
+        return _sample(hint)
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get('chat_id') or 1
+        message = {
+            'message_id': params.get('message_id') or next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id if isinstance(chat_id, int) else 1, 'type': 'private'},
+            'from': dict(BOT_USER)
+        }
+
+        if 'text' in params:
+            message['text'] = params['text']
+
+        if isinstance(params.get('reply_markup'), dict) and 'inline_keyboard' in params['reply_markup']:
+            message['reply_markup'] = params['reply_markup']
+
+        return message
+
+    @staticmethod
+    def _error(code: int, description: str, retry_after: Optional[int] = None) -> web.Response:
+        data = {'ok': False, 'error_code': code, 'description': description}
+
+        if retry_after is not None:
+            data['parameters'] = {'retry_after': retry_after}
+
+        return web.Response(body=codec.dumps(data), status=code, content_type='application/json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m botup.testing.fake_api', description='Fake Telegram Bot API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0, help='random extra latency up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of 500 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=0, help='share of 429 responses')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    server = FakeTelegramServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after
+    )
+    web.run_app(server.application(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
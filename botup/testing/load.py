@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from aiohttp import ClientSession
+
+from botup import codec
+
+UpdateHandler = Callable[[dict], Awaitable[Any]]
+
+
+class LoadReport:
+
+    def __init__(self, latencies: List[float], errors: int, duration: float):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.duration = duration
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self) -> float:
+        return self.count / self.duration if self.duration else 0.0
+
+    def percentile(self, value: float) -> float:
+        if not self.latencies:
+            return 0.0
+        index = min(len(self.latencies) - 1, int(round(value / 100 * (len(self.latencies) - 1))))
+        return self.latencies[index]
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'duration': self.duration,
+            'throughput': self.throughput,
+            'mean': statistics.fmean(self.latencies) if self.latencies else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.latencies[-1] if self.latencies else 0.0
+        }
+
+    def __str__(self) -> str:
+        data = self.as_dict()
+        return (
+            f'{data["count"]} updates in {data["duration"]:.2f}s '
+            f'({data["throughput"]:.1f}/s, {data["errors"]} errors), '
+            f'latency p50={data["p50"] * 1000:.1f}ms p90={data["p90"] * 1000:.1f}ms '
+            f'p99={data["p99"] * 1000:.1f}ms max={data["max"] * 1000:.1f}ms'
+        )
+
+
+def generate_updates(
+        count: int,
+        chats: int = 100,
+        texts: Iterable[str] = ('/start', 'hello'),
+        callbacks: Iterable[str] = ('none',),
+        callback_share: float = 0.5,
+        seed: Optional[int] = None
+) -> Iterator[dict]:
+
+    rnd = random.Random(seed)
+    texts = list(texts)
+    callbacks = list(callbacks)
+    update_ids = itertools.count(1)
+
+    for _ in range(count):
+        chat_id = rnd.randint(1, chats)
+        user = {'id': chat_id, 'is_bot': False, 'first_name': f'User{chat_id}'}
+        chat = {'id': chat_id, 'type': 'private', 'first_name': f'User{chat_id}'}
+        update_id = next(update_ids)
+
+        if callbacks and rnd.random() < callback_share:
+            yield {
+                'update_id': update_id,
+                'callback_query': {
+                    'id': str(update_id),
+                    'from': user,
+                    'chat_instance': str(chat_id),
+                    'data': rnd.choice(callbacks),
+                    'message': {'message_id': 1, 'date': int(time.time()), 'chat': chat, 'text': 'message'}
+                }
+            }
+            continue
+
+        text = rnd.choice(texts)
+        message = {'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': user, 'text': text}
+
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+
+        yield {'update_id': update_id, 'message': message}
+
+
+def webhook_target(session: ClientSession, url: str) -> UpdateHandler:
+    async def post(update: dict):
+        response = await session.post(url, data=codec.dumps(update), headers={'Content-Type': 'application/json'})
+        response.raise_for_status()
+        await response.read()
+
+    return post
+
+
+async def run_load(
+        handle: UpdateHandler,
+        updates: Iterable[dict],
+        concurrency: int = 100,
+        rate: Optional[float] = None
+) -> LoadReport:
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    tasks = []
+
+    async def run(update: dict):
+        nonlocal errors
+        start = time.perf_counter()
+
+        try:
+            await handle(update)
+        except Exception:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+        finally:
+            semaphore.release()
+
+    started = time.perf_counter()
+
+    for n, update in enumerate(updates):
+        if rate:
+            delay = started + n / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await semaphore.acquire()
+        tasks.append(asyncio.ensure_future(run(update)))
+
+    await asyncio.gather(*tasks)
+    return LoadReport(latencies, errors, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m botup.testing.load', description='Replay generated updates into a webhook')
+    parser.add_argument('url', help='webhook url')
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=None, help='updates per second, unlimited by default')
+    parser.add_argument('--text', action='append', help='message text to send, may be repeated')
+    parser.add_argument('--callback', action='append', help='callback data to send, may be repeated')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    async def run():
+        async with ClientSession() as session:
+            report = await run_load(
+                handle=webhook_target(session, args.url),
+                updates=generate_updates(
+                    args.updates,
+                    chats=args.chats,
+                    texts=args.text or ('/start', 'hello'),
+                    callbacks=args.callback or ('none',),
+                    seed=args.seed
+                ),
+                concurrency=args.concurrency,
+                rate=args.rate
+            )
+        print(report)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import gzip
+import importlib
+import time
+import zlib
+from typing import Any, Iterator, List, Optional, Tuple
+
+from botup import codec
+from botup.api import Api
+from botup.testing.fake_api import FakeTelegramServer
+from botup.testing.load import LoadReport, UpdateHandler
+from botup.utils import get_logger
+
+logger = get_logger()
+
+
+_GZIP_MAGIC = b'\x1f\x8b\x08'
+
+
+class UpdateRecorder:
+
+    def __init__(self, path: str, flush_every: int = 100):
+        self.path = path
+        self._file = open(path, 'ab')
+        self._flush_every = flush_every
+        self._lines: List[bytes] = []
+
+    def record(self, update: dict):
+        self._lines.append(codec.dumps({'t': time.time(), 'u': update}).encode() + b'\n')
+
+        if len(self._lines) >= self._flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+
+        # every flush appends one complete gzip member, a crash can only cut the last one short
+        self._file.write(gzip.compress(b''.join(self._lines)))
+        self._file.flush()
+        self._lines.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def wrap(self, handle: UpdateHandler) -> UpdateHandler:
+        async def recorded(update: dict):
+            self.record(update)
+            return await handle(update)
+
+        return recorded
+
+    def attach(self, target: Any):
+        target.handle = self.wrap(target.handle)
+
+
+def read_log(path: str) -> Iterator[Tuple[float, dict]]:
+    with open(path, 'rb') as fd:
+        data = fd.read()
+
+    for member in _read_members(data):
+        for line in member.splitlines():
+            if line.strip():
+                record = codec.loads(line)
+                yield record['t'], record['u']
+
+
+def _read_members(data: bytes) -> Iterator[bytes]:
+    while data:
+        decompressor = zlib.decompressobj(wbits=31)
+
+        try:
+            member = decompressor.decompress(data)
+        except zlib.error:
+            member = None
+
+        if member is None or not decompressor.eof:
+            # a member cut short by a crash, records appended after it start at the next member header
+            logger.warning('Skipping a truncated member of the update log')
+            start = data.find(_GZIP_MAGIC, 1)
+            if start < 0:
+                return
+            data = data[start:]
+            continue
+
+        yield member
+        data = decompressor.unused_data
+
+
+class MockApi(Api):
+
+    def __init__(self, token: str = 'token', latency: float = 0, **kwargs):
+        super().__init__(token, **kwargs)
+        self.latency = latency
+        self.server = FakeTelegramServer()
+
+    async def _send(self, method, data, headers, timeout) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        params = codec.loads(data) if isinstance(data, str) else dict(data)
+        self.server.calls[method] += 1
+        return self.server.result(method, params)
+
+
+class ReplayReport(LoadReport):
+
+    def __init__(self, per_update: List[Tuple[Optional[int], float]], errors: int, duration: float):
+        super().__init__([latency for _, latency in per_update], errors, duration)
+        self.per_update = per_update
+
+
+async def replay(
+        handle: UpdateHandler,
+        path: str,
+        speed: Optional[float] = 1.0,
+        concurrency: int = 1000
+) -> ReplayReport:
+
+    semaphore = asyncio.Semaphore(concurrency)
+    per_update: List[Tuple[Optional[int], float]] = []
+    errors = 0
+    tasks = []
+
+    async def run(update: dict):
+        nonlocal errors
+        start = time.perf_counter()
+
+        try:
+            await handle(update)
+        except Exception:
+            errors += 1
+        else:
+            per_update.append((update.get('update_id'), time.perf_counter() - start))
+        finally:
+            semaphore.release()
+
+    started = time.perf_counter()
+    first: Optional[float] = None
+
+    for recorded_at, update in read_log(path):
+        if first is None:
+            first = recorded_at
+
+        if speed:
+            delay = started + (recorded_at - first) / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await semaphore.acquire()
+        tasks.append(asyncio.ensure_future(run(update)))
+
+    await asyncio.gather(*tasks)
+    return ReplayReport(per_update, errors, time.perf_counter() - started)
+
+
+def _load_object(spec: str) -> Any:
+    module_name, _, attribute = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m botup.testing.replay', description='Replay a recorded update log')
+    parser.add_argument('log', help='path to a log written by UpdateRecorder')
+    parser.add_argument('factory', help='module:function returning a Bot or Dispatcher, called with a MockApi')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier, 0 for as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=1000)
+    parser.add_argument('--api-latency', type=float, default=0, help='seconds added to every mocked Api call')
+    parser.add_argument('--slowest', type=int, default=10, help='print this many slowest updates')
+    args = parser.parse_args(argv)
+
+    async def run():
+        api = MockApi(latency=args.api_latency)
+        target = _load_object(args.factory)(api)
+        report = await replay(target.handle, args.log, speed=args.speed or None, concurrency=args.concurrency)
+        await api.close_session()
+        print(report)
+
+        for update_id, latency in sorted(report.per_update, key=lambda p: p[1], reverse=True)[:args.slowest]:
+            print(f'update {update_id}: {latency * 1000:.2f}ms')
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
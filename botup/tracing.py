@@ -0,0 +1,132 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, TextIO
+
+from botup import codec
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('botup_current_span', default=None)
+
+
+class Span:
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_status(self, status: str):
+        pass
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+
+_NOOP_SPAN = Span()
+
+
+class Tracer:
+
+    def span(self, name: str, **attributes) -> Span:
+        return _NOOP_SPAN
+
+
+class SpanExporter:
+
+    def export(self, span: 'RecordedSpan'):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordedSpan(Span):
+
+    def __init__(self, exporter: SpanExporter, name: str, attributes: Dict[str, Any]):
+        self._exporter = exporter
+        self._token = None
+        self.name = name
+        self.attributes = attributes
+        self.status = 'ok'
+        self.span_id = os.urandom(8).hex()
+        self.trace_id: Optional[str] = None
+        self.parent_id: Optional[str] = None
+        self.start: Optional[float] = None
+        self.duration: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_status(self, status: str):
+        self.status = status
+
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': self.duration,
+            'status': self.status,
+            'attributes': self.attributes
+        }
+
+    def __enter__(self) -> 'RecordedSpan':
+        parent = _current_span.get()
+
+        if isinstance(parent, RecordedSpan):
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        else:
+            self.trace_id = os.urandom(16).hex()
+
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self._perf_start
+        _current_span.reset(self._token)
+
+        if exc_type is not None:
+            self.status = 'error'
+            self.attributes.setdefault('error', f'{exc_type.__name__}: {exc_val}')
+
+        self._exporter.export(self)
+        return None
+
+
+class RecordingTracer(Tracer):
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def span(self, name: str, **attributes) -> Span:
+        return RecordedSpan(self.exporter, name, attributes)
+
+
+class JsonLinesExporter(SpanExporter):
+
+    def __init__(self, path: str):
+        self._file: TextIO = open(path, 'a', encoding='utf-8')
+
+    def export(self, span: RecordedSpan):
+        self._file.write(codec.dumps(span.as_dict()) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
@@ -1617,6 +1617,11 @@ class BaseContext:
     update_type: Optional[UpdateType] = None
     chat_id: Optional[int] = None
     user_id: Optional[int] = None
+    command: Optional[str] = None
+    command_payload: Optional[str] = None
+
+    def start_callback_answer(self):
+        pass
 
     @property
     def is_message(self) -> bool:
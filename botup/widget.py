@@ -1,15 +1,23 @@
 from __future__ import annotations
 
-from typing import Dict, Optional, List
+import asyncio
+from typing import Dict, Optional, List, Tuple, TYPE_CHECKING
 
 from botup.api import Api
 from botup.dispatcher import Dispatcher
 from botup.types import Update, BaseContext
-from botup.state_manager.base import Singleton, StateManager
+from botup.state_manager.base import StateManager, StateKey
 from botup.exceptions import WidgetNotInRegistryError
+from botup.tracing import get_tracer
+from botup.utils import get_logger
 
+if TYPE_CHECKING:
+    from botup.path_table import PathNode
 
-class WidgetRegistry(metaclass=Singleton):
+logger = get_logger()
+
+
+class WidgetRegistry:
 
     def __init__(self):
         self._registry: Dict[str, Widget] = {}
@@ -24,30 +32,51 @@ class WidgetRegistry(metaclass=Singleton):
             raise WidgetNotInRegistryError(f'Widget with key "{key}" not found')
         return self._registry[key]
 
+    def __contains__(self, key: str) -> bool:
+        return key in self._registry
+
+    def __len__(self) -> int:
+        return len(self._registry)
+
+    def __iter__(self):
+        return iter(self._registry.values())
+
 
 class Widget:
 
+    state_keys: Tuple[StateKey, ...] = ()
+
     def __init__(
             self,
             key: Optional[str] = None,
-            children: Optional[List[Widget]] = None
+            children: Optional[List[Widget]] = None,
+            auto_answer_callbacks: bool = False
     ):
 
         self.key = key or self.__class__.__name__
-        self._dispatcher = Dispatcher()
+        self._dispatcher = Dispatcher(auto_answer_callbacks=auto_answer_callbacks)
         self.children = children or []
-        self._children_keys = [w.key for w in self.children]
+        self.parent: Optional[Widget] = None
+        self._children_keys = frozenset(w.key for w in self.children)
         self.build(self._dispatcher)
-        WidgetRegistry().add(self)
+
+    @property
+    def dispatcher(self) -> Dispatcher:
+        return self._dispatcher
 
     def build(self, dispatcher: Dispatcher):
         pass
 
+    def freeze(self):
+        self._children_keys = frozenset(w.key for w in self.children)
+        self._dispatcher.freeze()
+
     async def entry(self, ctx: Context, **kwargs):
         pass
 
     async def handle(self, ctx: Context):
-        await self._dispatcher.handle_context(ctx)
+        with get_tracer().span('widget.handle', widget=self.key):
+            await self._dispatcher.handle_context(ctx)
 
     def is_children_by_key(self, key: str) -> bool:
         return key in self._children_keys
@@ -60,16 +89,26 @@ class Context(BaseContext):
             update: Update,
             api: Api,
             root_widget: Widget,
-            state_manager: StateManager
+            state_manager: StateManager,
+            path_node: Optional[PathNode] = None,
+            path_version: Optional[int] = None
     ):
         super().__init__(update)
         self.api = api
         self.root_widget = root_widget
         self.state_manager = state_manager
+        # resolved by the bot before dispatching, reused by Navigation.of
+        self.path_node = path_node
+        self.path_version = path_version
+        self._callback_answer: Optional[asyncio.Task] = None
 
     async def get_path(self) -> str:
         return await self.state_manager.get_path(self.chat_id or self.get_chat_id()) or ''
 
+    async def get_path_version(self) -> Tuple[str, Optional[int]]:
+        path, version = await self.state_manager.get_path_version(self.chat_id or self.get_chat_id())
+        return path or '', version
+
     def get_chat_id(self) -> Optional[int]:
         if self.is_message:
             return self.update.message.chat.id
@@ -82,7 +121,22 @@ class Context(BaseContext):
 
         return None
 
+    def start_callback_answer(self):
+        if self._callback_answer is None and self.is_callback_query:
+            self._callback_answer = asyncio.ensure_future(self.api.answer_callback_query(self.update.callback_query.id))
+            self._callback_answer.add_done_callback(_log_callback_answer_error)
+
     async def quick_callback_answer(self):
         if not self.is_callback_query:
             raise Exception('Current update is not callback query')  # TODO: specify exception
+
+        if self._callback_answer is not None:
+            await self._callback_answer
+            return
+
         await self.api.answer_callback_query(self.update.callback_query.id)
+
+
+def _log_callback_answer_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f'Early callback answer failed: {task.exception()}')
@@ -0,0 +1,97 @@
+from typing import Dict, List, Sequence, Tuple
+
+from botup.constants.update_type import UpdateType
+from botup.exceptions import WidgetTreeError
+from botup.path_table import PathTable
+from botup.utils import get_logger
+from botup.state_manager.base import StateKey
+from botup.widget import Widget, WidgetRegistry
+
+logger = get_logger()
+
+
+class WidgetTree:
+
+    def __init__(self, root: Widget):
+        self.root = root
+        self.registry = WidgetRegistry()
+        self._compile()
+        self.paths = PathTable.of(root)
+        self._state_keys: Dict[Tuple[UpdateType, ...], Tuple[StateKey, ...]] = {}
+        self.stats = self._collect_stats()
+        logger.info(
+            f'Widget tree "{root.key}" compiled: {self.stats["widgets"]} widgets, '
+            f'{self.stats["paths"]} paths, {self.stats["handlers"]} handlers'
+        )
+
+    def __iter__(self):
+        return iter(self.registry)
+
+    def get(self, key: str) -> Widget:
+        return self.registry.get(key)
+
+    def get_state_keys(self, update_types: Sequence[UpdateType]) -> Tuple[StateKey, ...]:
+        update_types = tuple(update_types)
+        keys = self._state_keys.get(update_types)
+
+        if keys is None:
+            keys = self._state_keys[update_types] = tuple(dict.fromkeys(
+                key for w in self.registry if w.dispatcher.accepts(update_types) for key in w.state_keys
+            ))
+
+        return keys
+
+    def _compile(self):
+        self._validate_key(self.root)
+        self._check_cycles(self.root, ())
+        self.root.parent = None
+        self.registry.add(self.root)
+        queue: List[Widget] = [self.root]
+
+        while queue:
+            widget = queue.pop(0)
+            child_keys = set()
+
+            for child in widget.children:
+                self._validate_key(child)
+
+                if child.key in child_keys:
+                    raise WidgetTreeError(f'Widget "{widget.key}" has several children with key "{child.key}"')
+                child_keys.add(child.key)
+
+                if child.key in self.registry:
+                    if self.registry.get(child.key) is not child:
+                        raise WidgetTreeError(f'Widget key "{child.key}" is used by several widgets')
+                    # a widget shared by several parents is compiled once, the path table keeps all of its paths
+                    continue
+
+                child.parent = widget
+                self.registry.add(child)
+                queue.append(child)
+
+            widget.freeze()
+
+    def _check_cycles(self, widget: Widget, ancestors: Tuple[Widget, ...]):
+        ancestors += (widget,)
+
+        for child in widget.children:
+            if any(child is ancestor for ancestor in ancestors):
+                raise WidgetTreeError(f'Widget "{child.key}" is its own ancestor')
+            self._check_cycles(child, ancestors)
+
+    @staticmethod
+    def _validate_key(widget: Widget):
+        if not isinstance(widget.key, str) or not widget.key:
+            raise WidgetTreeError(f'Widget {widget!r} has an empty key')
+
+        if '/' in widget.key or widget.key.startswith(PathTable.ID_PREFIX):
+            raise WidgetTreeError(f'Widget key "{widget.key}" must not contain "/" or start with "{PathTable.ID_PREFIX}"')
+
+    def _collect_stats(self) -> Dict[str, int]:
+        return {
+            'widgets': len(self.registry),
+            'paths': len(self.paths),
+            'max_depth': max(len(node.widgets) for node in self.paths.nodes()),
+            'handlers': sum(w.dispatcher.handlers_count() for w in self.registry),
+            'middlewares': sum(len(w.dispatcher.middlewares) for w in self.registry)
+        }
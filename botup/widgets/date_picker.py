@@ -19,20 +19,31 @@ class DatePicker(Widget):
             self,
             key: Optional[str] = None,
             result_key: str = DEFAULT_RESULT_KEY,
-            message_text: str = 'Date picker'
+            message_text: str = 'Date picker',
+            stateless: bool = False,
+            auto_answer_callbacks: bool = False
     ):
-        super().__init__(key)
+        self._stateless = stateless
+        super().__init__(key, auto_answer_callbacks=auto_answer_callbacks)
         self._message_text = message_text
         self._storage_section = 'botup_date_picker'
         self._storage_value_key = 'value'
         self._storage_message_id_key = 'message_id'
         self._result_key = result_key
+        if not stateless:
+            self.state_keys = (
+                (self._storage_section, self._storage_value_key),
+                (self._storage_section, self._storage_message_id_key)
+            )
 
     def build(self, dispatcher: Dispatcher):
-        dispatcher.register_callback_handler('left', self._clb_month)
-        dispatcher.register_callback_handler('right', self._clb_month)
-        dispatcher.register_callback_handler('left_year', self._clb_year)
-        dispatcher.register_callback_handler('right_year', self._clb_year)
+        if self._stateless:
+            dispatcher.register_callback_handler(re.compile('^m '), self._clb_goto)
+        else:
+            dispatcher.register_callback_handler('left', self._clb_month)
+            dispatcher.register_callback_handler('right', self._clb_month)
+            dispatcher.register_callback_handler('left_year', self._clb_year)
+            dispatcher.register_callback_handler('right_year', self._clb_year)
         dispatcher.register_callback_handler('none', self._clb_none)
         dispatcher.register_callback_handler('back', self._clb_back)
         dispatcher.register_command_handler('/back', self._cmd_back)
@@ -50,6 +61,15 @@ class DatePicker(Widget):
                 reply_markup=self._calendar_keyboard(start_date.year, start_date.month)
             )
 
+            if self._stateless:
+                await ctx.state_manager.set(
+                    chat_id=ctx.chat_id,
+                    key=self._storage_message_id_key,
+                    value=str(message.message_id),
+                    section=self._storage_section
+                )
+                return
+
             await gather(
                 ctx.state_manager.set(
                     chat_id=ctx.chat_id,
@@ -68,6 +88,23 @@ class DatePicker(Widget):
 
         assert isinstance(message_id, int)
 
+        if self._stateless:
+            await gather(
+                ctx.api.edit_message_text(
+                    text=self._message_text,
+                    chat_id=ctx.chat_id,
+                    message_id=message_id,
+                    reply_markup=self._calendar_keyboard(start_date.year, start_date.month)
+                ),
+                ctx.state_manager.set(
+                    chat_id=ctx.chat_id,
+                    key=self._storage_message_id_key,
+                    value=str(message_id),
+                    section=self._storage_section
+                )
+            )
+            return
+
         await gather(
             ctx.api.edit_message_text(
                 text=self._message_text,
@@ -89,6 +126,17 @@ class DatePicker(Widget):
             )
         )
 
+    @staticmethod
+    def _shift_month(year: int, month: int, months: int) -> str:
+        year, month = divmod(year * 12 + month - 1 + months, 12)
+        return f'{year:04d}-{month + 1:02d}'
+
+    def _arrows(self, year: int, month: int):
+        if not self._stateless:
+            return 'left', 'right', 'left_year', 'right_year'
+
+        return tuple(f'm {self._shift_month(year, month, months)}' for months in (-1, 1, -12, 12))
+
     @staticmethod
     def _chunks(lst, n):
         for i in range(0, len(lst), n):
@@ -109,25 +157,39 @@ class DatePicker(Widget):
 
             lines.append(args)
 
+        left, right, left_year, right_year = self._arrows(year, month)
         lines.append([
-            InlineKeyboardButton(text='<', callback_data='left'),
+            InlineKeyboardButton(text='<', callback_data=left),
             InlineKeyboardButton(text=month_name[month], callback_data='none'),
-            InlineKeyboardButton(text='>', callback_data='right')
+            InlineKeyboardButton(text='>', callback_data=right)
         ])
         lines.append([
-            InlineKeyboardButton(text='<', callback_data='left_year'),
+            InlineKeyboardButton(text='<', callback_data=left_year),
             InlineKeyboardButton(text=str(year), callback_data='none'),
-            InlineKeyboardButton(text='>', callback_data='right_year')
+            InlineKeyboardButton(text='>', callback_data=right_year)
         ])
         lines.append([InlineKeyboardButton(text='Back', callback_data='back')])
 
         return InlineKeyboardMarkup(lines)
 
+    async def _clb_goto(self, ctx: Context):
+        _, year_month = ctx.update.callback_query.data.split()
+        date = datetime.strptime(year_month, '%Y-%m')
+
+        await gather(
+            ctx.quick_callback_answer(),
+            ctx.api.edit_message_reply_markup(
+                chat_id=ctx.chat_id,
+                message_id=ctx.update.callback_query.message.message_id,
+                reply_markup=self._calendar_keyboard(date.year, date.month)
+            )
+        )
+
     async def _clb_month(self, ctx: Context):
         func = operator.sub if ctx.update.callback_query.data == 'left' else operator.add
 
         _, message_id, year_month = await gather(
-            ctx.api.answer_callback_query(ctx.update.callback_query.id),
+            ctx.quick_callback_answer(),
             ctx.state_manager.get(
                 chat_id=ctx.chat_id,
                 section=self._storage_section,
@@ -163,7 +225,7 @@ class DatePicker(Widget):
         func = operator.sub if ctx.update.callback_query.data == 'left_year' else operator.add
 
         _, message_id, year_month = await gather(
-            ctx.api.answer_callback_query(ctx.update.callback_query.id),
+            ctx.quick_callback_answer(),
             ctx.state_manager.get(
                 chat_id=ctx.chat_id,
                 section=self._storage_section,
@@ -195,13 +257,9 @@ class DatePicker(Widget):
 
     async def _clb_day(self, ctx: Context):
         _, nav, message_id = await gather(
-            ctx.api.answer_callback_query(ctx.update.callback_query.id),
+            ctx.quick_callback_answer(),
             Navigation.of(ctx),
-            ctx.state_manager.get(
-                chat_id=ctx.chat_id,
-                section=self._storage_section,
-                key=self._storage_message_id_key
-            )
+            self._get_message_id(ctx)
         )
         _, date_str = ctx.update.callback_query.data.split()
         await gather(
@@ -214,13 +272,9 @@ class DatePicker(Widget):
 
     async def _clb_back(self, ctx: Context):
         _, nav, message_id = await gather(
-            ctx.api.answer_callback_query(ctx.update.callback_query.id),
+            ctx.quick_callback_answer(),
             Navigation.of(ctx),
-            ctx.state_manager.get(
-                chat_id=ctx.chat_id,
-                section=self._storage_section,
-                key=self._storage_message_id_key
-            )
+            self._get_message_id(ctx)
         )
         await gather(
             ctx.api.delete_message(
@@ -230,8 +284,18 @@ class DatePicker(Widget):
             nav.pop()
         )
 
+    async def _get_message_id(self, ctx: Context):
+        if self._stateless:
+            return ctx.update.callback_query.message.message_id
+
+        return await ctx.state_manager.get(
+            chat_id=ctx.chat_id,
+            section=self._storage_section,
+            key=self._storage_message_id_key
+        )
+
     async def _clb_none(self, ctx: Context):
-        await ctx.api.answer_callback_query(ctx.update.callback_query.id)
+        await ctx.quick_callback_answer()
 
     async def _cmd_back(self, ctx: Context):
         nav, message_id = await gather(
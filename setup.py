@@ -18,7 +18,8 @@ setup(
         'aiohttp'
     ],
     extras_require={
-        'redis': ['redis']
+        'redis': ['redis'],
+        'orjson': ['orjson']
     },
     project_urls={
         'Source Code': 'https://github.com/spirtum/telegram-botup'
@@ -0,0 +1,68 @@
+import asyncio
+
+from botup.admission import AdmissionPolicy, drain_updates
+from botup.constants.update_type import CALLBACK_QUERY, MESSAGE_COMMAND, MESSAGE_TEXT
+from botup.testing.replay import MockApi
+
+NOW = 1000000
+
+
+def message(text, date, chat_id=1):
+    return {
+        'message': {
+            'message_id': 1,
+            'date': date,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            'text': text
+        }
+    }
+
+
+def callback(data, chat_id=1):
+    return {
+        'callback_query': {
+            'id': data,
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            'message': {'message_id': 1, 'date': 0, 'chat': {'id': chat_id, 'type': 'private'}},
+            'chat_instance': '1',
+            'data': data
+        }
+    }
+
+
+def test_admission_thresholds():
+    policy = AdmissionPolicy({MESSAGE_COMMAND: 60, MESSAGE_TEXT: 600}, clock=lambda: NOW)
+
+    assert policy.admit(message('/start', NOW - 30))
+    assert not policy.admit(message('/start', NOW - 120))
+    assert policy.admit(message('hello', NOW - 120))
+    assert not policy.admit(message('hello', NOW - 1200))
+    assert policy.admit(callback('old'))
+    assert policy.admitted == 3
+    assert policy.dropped == {MESSAGE_COMMAND: 1, MESSAGE_TEXT: 1}
+
+
+def test_drain_updates_sheds_backlog():
+    policy = AdmissionPolicy({MESSAGE_TEXT: 60, CALLBACK_QUERY: 60}, clock=lambda: NOW)
+    handled = []
+
+    async def handle(update):
+        handled.append(update['update_id'])
+
+    async def run():
+        api = MockApi()
+        for update in (message('old', NOW - 300), callback('stale'), message('old', NOW - 200, chat_id=2),
+                       message('new', NOW - 10), callback('fresh'), message('new', NOW - 5, chat_id=2)):
+            api.server.push_update(update)
+
+        offset = await drain_updates(api, handle, policy, limit=4)
+        await api.drain()
+        await api.close_session()
+        return offset, api.server.calls['answerCallbackQuery']
+
+    offset, answers = asyncio.run(run())
+    assert sorted(handled) == [4, 5, 6]
+    assert offset == 7
+    assert answers == 1
+    assert policy.dropped[CALLBACK_QUERY] == 1
@@ -0,0 +1,243 @@
+import asyncio
+
+import pytest
+
+from botup import codec
+from botup.api import Api
+from botup.constants import api_method
+from botup.exceptions import ApiError, CircuitOpenError
+from botup.policy import PolicyEngine, RequestPolicy, CircuitBreaker
+from botup.tracing import RecordingTracer, Tracer, get_tracer, set_tracer
+from botup.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, InputFilePath
+
+
+class FakeResponse:
+
+    def __init__(self, payload: dict, status: int = 200):
+        self.status = status
+        self._body = codec.dumps(payload).encode()
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class FakeSession:
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = list()
+
+    async def post(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        await asyncio.sleep(0)
+        return FakeResponse({'ok': True, 'result': self.result})
+
+    async def close(self):
+        pass
+
+
+def message_result(text='test'):
+    return {
+        'message_id': 1,
+        'date': 123,
+        'chat': {'id': 1, 'type': 'private'},
+        'text': text
+    }
+
+
+def make_api(result, **kwargs) -> Api:
+    async def create():
+        api = Api('token', **kwargs)
+        await api.close_session()
+        return api
+
+    api = asyncio.run(create())
+    api._session = FakeSession(result)
+    return api
+
+
+def test_codec_backends():
+    for backend in ('json', codec.get_backend()):
+        previous = codec.get_backend()
+        codec.set_backend(backend)
+        try:
+            assert codec.loads(codec.dumps({'text': 'привет', 'n': 1})) == {'text': 'привет', 'n': 1}
+        finally:
+            codec.set_backend(previous)
+
+
+def test_response_decoding():
+    api = make_api(message_result())
+    message = asyncio.run(api.send_message(chat_id=1, text='test'))
+    assert isinstance(message, Message)
+    assert message.text == 'test'
+
+
+def test_response_skip_decode():
+    api = make_api(message_result())
+    result = asyncio.run(api.send_message(chat_id=1, text='test', decode=False))
+    assert result == message_result()
+    _, kwargs = api._session.calls[-1]
+    assert 'decode' not in kwargs['data']
+
+
+def test_json_request_body():
+    api = make_api(message_result())
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton('text', callback_data='data')]])
+    asyncio.run(api.send_message(chat_id=1, text='test', reply_markup=keyboard, disable_notification=True))
+    _, kwargs = api._session.calls[-1]
+    assert kwargs['headers']['Content-Type'] == 'application/json'
+    assert codec.loads(kwargs['data']) == {
+        'chat_id': 1,
+        'text': 'test',
+        'disable_notification': True,
+        'reply_markup': {'inline_keyboard': [[{'text': 'text', 'callback_data': 'data'}]]}
+    }
+
+
+def test_multipart_request_body(tmp_path):
+    path = tmp_path / 'photo.jpg'
+    path.write_bytes(b'photo')
+    api = make_api(message_result())
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton('text', callback_data='data')]])
+    asyncio.run(api.send_photo(chat_id=1, photo=InputFilePath(path), reply_markup=keyboard))
+    _, kwargs = api._session.calls[-1]
+    data = kwargs['data']
+    assert kwargs['headers'] is None
+    assert data['chat_id'] == '1'
+    assert codec.loads(data['reply_markup']) == {'inline_keyboard': [[{'text': 'text', 'callback_data': 'data'}]]}
+    assert data['photo'].read() == b'photo'
+    data['photo'].close()
+
+
+def test_enqueue_keeps_chat_order_and_drains_on_close():
+    calls = list()
+    errors = list()
+
+    async def on_error(error, function, kwargs):
+        errors.append((error, kwargs))
+
+    async def call(chat_id, n):
+        await asyncio.sleep(0.001 * (5 - n))
+        if n == 3:
+            raise ValueError(n)
+        calls.append((chat_id, n))
+
+    async def run():
+        api = Api('token', queue_workers=2, on_queue_error=on_error)
+        for n in range(5):
+            api.enqueue(call, chat_id=1, n=n)
+            api.enqueue(call, chat_id=2, n=n)
+        await api.close_session()
+
+    asyncio.run(run())
+    assert [n for chat_id, n in calls if chat_id == 1] == [0, 1, 2, 4]
+    assert [n for chat_id, n in calls if chat_id == 2] == [0, 1, 2, 4]
+    assert len(errors) == 2
+
+
+class ListExporter:
+
+    def __init__(self):
+        self.spans = list()
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_enqueued_calls_keep_their_submitter_span():
+    exporter = ListExporter()
+    set_tracer(RecordingTracer(exporter))
+
+    async def call(chat_id, label):
+        with get_tracer().span('call', label=label):
+            pass
+
+    async def run():
+        api = Api('token', queue_workers=1)
+        for label in ('first', 'second'):
+            with get_tracer().span('update', label=label):
+                api.enqueue(call, chat_id=1, label=label)
+        api.enqueue(call, chat_id=1, label='none')
+        await api.close_session()
+
+    try:
+        asyncio.run(run())
+    finally:
+        set_tracer(Tracer())
+
+    updates = {span.attributes['label']: span for span in exporter.spans if span.name == 'update'}
+    calls = {span.attributes['label']: span for span in exporter.spans if span.name == 'call'}
+    assert calls['first'].parent_id == updates['first'].span_id
+    assert calls['second'].parent_id == updates['second'].span_id
+    assert calls['none'].parent_id is None
+
+
+def test_edit_coalescing():
+    api = make_api(message_result(), coalesce_edits=True)
+
+    async def run():
+        await asyncio.gather(*(
+            api.edit_message_text(text=f'text {n}', chat_id=1, message_id=1)
+            for n in range(5)
+        ))
+        await api.edit_message_text(text='text 4', chat_id=1, message_id=1)
+        await api.edit_message_text(text='text 4', chat_id=1, message_id=2)
+
+    asyncio.run(run())
+    texts = [(codec.loads(kwargs['data'])['message_id'], codec.loads(kwargs['data'])['text'])
+             for _, kwargs in api._session.calls]
+    assert texts == [(1, 'text 0'), (1, 'text 4'), (2, 'text 4')]
+
+
+def test_policy_retries_rate_limited_calls():
+    engine = PolicyEngine(RequestPolicy(retries=2))
+    attempts = list()
+
+    async def send(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise ApiError({'ok': False, 'error_code': 429, 'parameters': {'retry_after': 0}})
+        return True
+
+    assert asyncio.run(engine.execute(api_method.SEND_MESSAGE, send)) is True
+    assert len(attempts) == 3
+    assert engine.snapshot()[api_method.SEND_MESSAGE]['count'] == 3
+
+
+def test_policy_does_not_retry_non_idempotent_timeouts():
+    engine = PolicyEngine(RequestPolicy(retries=2))
+    attempts = list()
+
+    async def send(timeout):
+        attempts.append(timeout)
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(engine.execute(api_method.SEND_MESSAGE, send))
+    assert len(attempts) == 1
+
+
+def test_policy_hedges_slow_reads():
+    engine = PolicyEngine(policies={api_method.GET_CHAT: RequestPolicy(idempotent=True, hedge_after=0.01)})
+    delays = [1, 0]
+
+    async def send(timeout):
+        await asyncio.sleep(delays.pop(0))
+        return 'fast'
+
+    assert asyncio.run(asyncio.wait_for(engine.execute(api_method.GET_CHAT, send), 0.5)) == 'fast'
+
+
+def test_circuit_breaker_opens():
+    engine = PolicyEngine(breaker=CircuitBreaker(failure_threshold=2))
+
+    async def send(timeout):
+        raise ApiError({'ok': False, 'error_code': 502})
+
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            asyncio.run(engine.execute(api_method.SEND_MESSAGE, send))
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(engine.execute(api_method.SEND_MESSAGE, send))
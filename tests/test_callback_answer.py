@@ -0,0 +1,59 @@
+import asyncio
+
+from botup.bot import Bot
+from botup.dispatcher import claims_callback_answer
+from botup.testing.replay import MockApi
+from botup.widget import Widget, Context
+
+
+def callback_update(data):
+    return {
+        'update_id': 1,
+        'callback_query': {
+            'id': data,
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            'message': {'message_id': 1, 'date': 1, 'chat': {'id': 1, 'type': 'private'}},
+            'chat_instance': '1',
+            'data': data
+        }
+    }
+
+
+class ButtonsWidget(Widget):
+
+    def __init__(self):
+        super().__init__(auto_answer_callbacks=True)
+        self.answers_seen = []
+
+    def build(self, dispatcher):
+        dispatcher.register_callback_handler('slow', self.slow)
+        dispatcher.register_callback_handler('quick', self.quick)
+        dispatcher.register_callback_handler('claimed', self.claimed)
+
+    async def slow(self, ctx: Context):
+        await asyncio.sleep(0.01)
+        self.answers_seen.append(ctx.api.server.calls['answerCallbackQuery'])
+
+    async def quick(self, ctx: Context):
+        await ctx.quick_callback_answer()
+        self.answers_seen.append(ctx.api.server.calls['answerCallbackQuery'])
+
+    @claims_callback_answer
+    async def claimed(self, ctx: Context):
+        await asyncio.sleep(0.01)
+        self.answers_seen.append(ctx.api.server.calls['answerCallbackQuery'])
+        await ctx.api.answer_callback_query(ctx.update.callback_query.id, text='done')
+
+
+def test_callbacks_are_answered_early():
+    async def run():
+        widget = ButtonsWidget()
+        bot = Bot('token', widget, api=MockApi())
+
+        for data in ('slow', 'quick', 'claimed'):
+            await bot.handle(callback_update(data))
+
+        await bot.close_session()
+        return widget.answers_seen, bot._api.server.calls['answerCallbackQuery']
+
+    assert asyncio.run(run()) == ([1, 2, 2], 3)
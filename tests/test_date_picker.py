@@ -0,0 +1,89 @@
+import asyncio
+
+from botup.bot import Bot
+from botup.state_manager.base import DictStateManager
+from botup.testing.replay import MockApi
+from botup.widget import Widget
+from botup.widgets.date_picker import DatePicker
+
+
+class PathOnlyStateManager(DictStateManager):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    async def get(self, chat_id, key, section='botup-user'):
+        self.calls.append('get')
+        return await super().get(chat_id, key, section)
+
+    async def set(self, chat_id, key, value, section='botup-user'):
+        self.calls.append('set')
+        await super().set(chat_id, key, value, section)
+
+    async def get_many(self, chat_id, keys):
+        self.calls.append('get_many')
+        return await super().get_many(chat_id, keys)
+
+
+class Root(Widget):
+    pass
+
+
+def callback_update(update_id, data):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            'message': {'message_id': 5, 'date': 1, 'chat': {'id': 1, 'type': 'private'}},
+            'chat_instance': '1',
+            'data': data
+        }
+    }
+
+
+def handle_callbacks(picker, state_manager, *data):
+    async def run():
+        bot = Bot('token', Root(children=[picker]), state_manager=state_manager, api=MockApi())
+        node = next(node for node in bot.tree.paths.nodes() if node.widget is picker)
+        await state_manager.set_path(1, node.id)
+
+        for update_id, callback_data in enumerate(data, 1):
+            await bot.handle(callback_update(update_id, callback_data))
+
+        await bot.close_session()
+        return bot._api.server.calls
+
+    return asyncio.run(run())
+
+
+def test_stateless_date_picker_pages_without_state():
+    state_manager = PathOnlyStateManager()
+    picker = DatePicker(stateless=True)
+    keyboard = picker._calendar_keyboard(2024, 12).inline_keyboard
+
+    calls = handle_callbacks(picker, state_manager, 'm 2025-01')
+    assert [button.callback_data for button in keyboard[-3]] == ['m 2024-11', 'none', 'm 2025-01']
+    assert [button.callback_data for button in keyboard[-2]] == ['m 2023-12', 'none', 'm 2025-12']
+    assert calls == {'editMessageReplyMarkup': 1, 'answerCallbackQuery': 1}
+    assert not state_manager.calls
+
+
+def test_stateless_paging_never_touches_state():
+    state_manager = PathOnlyStateManager()
+    picker = DatePicker(stateless=True)
+
+    calls = handle_callbacks(picker, state_manager, 'm 2025-01', 'm 2025-02', 'm 2026-02', 'none', 'm 2024-12')
+    assert calls['editMessageReplyMarkup'] == 4
+    assert calls['answerCallbackQuery'] == 5
+    assert state_manager.calls == []
+
+
+def test_auto_answer_callbacks_is_passed_through():
+    assert not DatePicker().dispatcher.auto_answer_callbacks
+    assert DatePicker(auto_answer_callbacks=True).dispatcher.auto_answer_callbacks
+    assert handle_callbacks(DatePicker(stateless=True, auto_answer_callbacks=True), DictStateManager(), 'm 2025-01') == {
+        'editMessageReplyMarkup': 1,
+        'answerCallbackQuery': 1
+    }
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from botup.bot import Bot
+from botup.dedup import WindowDeduplicator
+from botup.dispatcher import Dispatcher
+from botup.redis_dedup import RedisDeduplicator
+from botup.widget import Widget, Context
+
+
+def message_update(update_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': 1,
+            'date': 1,
+            'chat': {'id': 1, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            'text': 'hello'
+        }
+    }
+
+
+def test_window_deduplicator():
+    deduplicator = WindowDeduplicator(size=16)
+
+    assert not deduplicator.check(100)
+    assert deduplicator.check(100)
+    assert not deduplicator.check(99)
+    assert not deduplicator.check(110)
+    assert deduplicator.check(99)
+    assert not deduplicator.check(116)
+    assert not deduplicator.check(100)
+    assert not deduplicator.check(None)
+    assert not deduplicator.check(5000)
+    assert not deduplicator.check(100)
+    assert deduplicator.duplicates == 2
+
+
+def test_window_deduplicator_keeps_window_on_old_id():
+    deduplicator = WindowDeduplicator(size=16)
+
+    assert not deduplicator.check(100)
+    assert not deduplicator.check(110)
+    assert not deduplicator.check(50)
+    assert not deduplicator.check(50)
+    assert deduplicator.check(110)
+    assert deduplicator.check(100)
+
+
+def test_dispatcher_drops_duplicates():
+    seen = []
+    dispatcher = Dispatcher(deduplicator=WindowDeduplicator())
+
+    @dispatcher.message_handler('hello')
+    async def hello(ctx):
+        seen.append(ctx.update.update_id)
+
+    async def run():
+        for update_id in (1, 2, 1, 3, 2):
+            await dispatcher.handle(message_update(update_id))
+
+    asyncio.run(run())
+    assert seen == [1, 2, 3]
+
+
+class CountingWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_message_handler('hello', self.hello)
+
+    @staticmethod
+    async def hello(ctx: Context):
+        count = int(await ctx.state_manager.get(ctx.chat_id, 'count') or 0)
+        await ctx.state_manager.set(ctx.chat_id, 'count', str(count + 1))
+
+
+def test_bot_drops_duplicates():
+    async def run():
+        bot = Bot('token', CountingWidget(), deduplicator=WindowDeduplicator())
+        await asyncio.gather(*(bot.handle(message_update(update_id)) for update_id in (1, 1, 2, 1)))
+        await bot.close_session()
+        return await bot._state_manager.get(1, 'count'), bot.deduplicator.duplicates
+
+    assert asyncio.run(run()) == ('2', 2)
+
+
+class FailingWidget(Widget):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def build(self, dispatcher):
+        dispatcher.register_message_handler('hello', self.hello)
+
+    async def hello(self, ctx: Context):
+        self.calls += 1
+        if self.calls == 1:
+            raise Exception('Handling failed')
+
+
+def test_failed_update_is_not_a_duplicate():
+    async def run():
+        root = FailingWidget()
+        bot = Bot('token', root, deduplicator=WindowDeduplicator())
+
+        with pytest.raises(Exception):
+            await bot.handle(message_update(1))
+
+        await bot.handle(message_update(1))
+        await bot.handle(message_update(1))
+        await bot.close_session()
+        return root.calls, bot.deduplicator.duplicates
+
+    assert asyncio.run(run()) == (2, 1)
+
+
+def test_redis_deduplicator_forgets_failed_update():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def run():
+        deduplicator = RedisDeduplicator(redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+        first = await deduplicator.is_duplicate(1)
+        await deduplicator.forget(1)
+        # another process has no local window, only redis decides
+        other = RedisDeduplicator(redis=deduplicator.redis)
+        return first, await other.is_duplicate(1), await deduplicator.is_duplicate(1), await other.is_duplicate(1)
+
+    assert asyncio.run(run()) == (False, False, True, True)
@@ -1,6 +1,8 @@
 import re
 import asyncio
 
+from botup.bot import Bot
+from botup.widget import Widget
 from tests import utils
 
 
@@ -942,6 +944,98 @@ def test_match_sequence(dispatcher):
     assert calls[-1] is abc_handler
     assert contexts[-1] is abc_message_update
 
+
+def test_command_with_mention_and_payload(dispatcher):
+    dispatcher.bot_username = utils.BOT_USERNAME
+    start_update = utils.command_update_by_text('/start@botusername ref123')
+    help_update = utils.command_update_by_text('/help  me  please ')
+    exact_update = utils.command_update_by_text('/start full')
+
+    calls = list()
+
+    async def start_handler(u):
+        calls.append((start_handler, u.command, u.command_payload))
+
+    async def help_handler(u):
+        calls.append((help_handler, u.command, u.command_payload))
+
+    async def exact_handler(u):
+        calls.append((exact_handler, u.command, u.command_payload))
+
+    dispatcher.register_command_handler('start', start_handler)
+    dispatcher.register_command_handler('/help', help_handler)
+    dispatcher.register_command_handler('/start full', exact_handler)
+    asyncio.run(dispatcher.handle_context(start_update))
+    asyncio.run(dispatcher.handle_context(help_update))
+    asyncio.run(dispatcher.handle_context(exact_update))
+    assert calls == [
+        (start_handler, '/start', 'ref123'),
+        (help_handler, '/help', 'me  please'),
+        (exact_handler, '/start', 'full')
+    ]
+
+
+def test_command_for_other_bot_is_ignored(dispatcher):
+    calls = list()
+
+    async def start_handler(u):
+        calls.append(u.command)
+
+    dispatcher.bot_username = utils.BOT_USERNAME
+    dispatcher.register_command_handler('start', start_handler)
+    asyncio.run(dispatcher.handle_context(utils.command_update_by_text('/start@other_bot ref')))
+    asyncio.run(dispatcher.handle_context(utils.command_update_by_text('/start@BotUsername')))
+    asyncio.run(dispatcher.handle_context(utils.command_update_by_text('/start')))
+    assert calls == ['/start', '/start']
+
+
+class CommandWidget(Widget):
+
+    def __init__(self):
+        super().__init__('Commands')
+        self.calls = list()
+
+    def build(self, dispatcher):
+        dispatcher.register_command_handler('start', self.start)
+        dispatcher.register_command_handler('/help@MyBot', self.help)
+        dispatcher.register_command_handler(re.compile('^/go'), self.go)
+
+    async def start(self, ctx):
+        self.calls.append(('start', ctx.command, ctx.command_payload))
+
+    async def help(self, ctx):
+        self.calls.append(('help', ctx.command, ctx.command_payload))
+
+    async def go(self, ctx):
+        self.calls.append(('go', ctx.command, ctx.command_payload))
+
+
+def raw_command_update(update_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1,
+            'chat': {'id': utils.GROUP_ID, 'type': 'group', 'title': utils.GROUP_TITLE},
+            'from': {'id': utils.USER_ID, 'is_bot': False, 'first_name': utils.USER_FIRST_NAME},
+            'text': text,
+            'entities': [{'offset': 0, 'length': len(text.split()[0]), 'type': 'bot_command'}]
+        }
+    }
+
+
+def test_command_mention_without_known_username():
+    root = CommandWidget()
+
+    async def run():
+        bot = Bot('token', root)
+        for update_id, text in enumerate(('/start@MyBot ref', '/help@MyBot', '/go@MyBot now'), 1):
+            await bot.handle(raw_command_update(update_id, text))
+        await bot.close_session()
+
+    asyncio.run(run())
+    assert root.calls == [('start', '/start', 'ref'), ('help', '/help', ''), ('go', '/go', 'now')]
+
 # TODO test_pre_checkout_query
 # TODO test_shipping_query
 # TODO test_connected_website
@@ -0,0 +1,92 @@
+import asyncio
+
+from botup.executor import UpdateExecutor
+
+
+def message(update_id, chat_id):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': 'hello'}}
+
+
+def callback(update_id, chat_id):
+    return {'update_id': update_id, 'callback_query': {'id': '1', 'from': {'id': chat_id}, 'data': 'x'}}
+
+
+def pre_checkout(update_id, user_id):
+    return {'update_id': update_id, 'pre_checkout_query': {'id': '1', 'from': {'id': user_id}}}
+
+
+def test_priority_order():
+    seen = []
+
+    async def handle(update):
+        seen.append(update['update_id'])
+
+    async def run():
+        executor = UpdateExecutor(handle, workers=1)
+        for update in (message(1, 1), message(2, 2), callback(3, 3), pre_checkout(4, 4), message(5, 5)):
+            executor.submit(update)
+        await executor.close()
+
+    asyncio.run(run())
+    assert seen == [4, 3, 1, 2, 5]
+
+
+def test_one_chat_at_a_time():
+    seen = []
+    running = set()
+
+    async def handle(update):
+        chat_id = update['message']['chat']['id']
+        assert chat_id not in running
+        running.add(chat_id)
+        await asyncio.sleep(0.01 if update['update_id'] % 2 else 0)
+        running.discard(chat_id)
+        seen.append(update['update_id'])
+
+    async def run():
+        executor = UpdateExecutor(handle, workers=4)
+        for update_id in range(1, 7):
+            executor.submit(message(update_id, update_id % 2))
+        await executor.close()
+        return executor._chats
+
+    assert asyncio.run(run()) == {}
+    assert [u for u in seen if u % 2] == [1, 3, 5]
+    assert [u for u in seen if not u % 2] == [2, 4, 6]
+
+
+def test_chat_order_beats_priority():
+    seen = []
+
+    async def handle(update):
+        await asyncio.sleep(0.02 if 'message' in update else 0.01)
+        seen.append(update['update_id'])
+
+    async def run():
+        executor = UpdateExecutor(handle, workers=4)
+        executor.submit(message(1, 1))
+        executor.submit(callback(2, 1))
+        executor.submit(message(3, 2))
+        assert executor.pending == 3
+        await executor.close()
+
+    asyncio.run(run())
+    assert seen.index(1) < seen.index(2)
+
+
+def test_waiting_chat_does_not_hold_a_worker():
+    seen = []
+
+    async def handle(update):
+        if update['update_id'] == 1:
+            await asyncio.sleep(0.05)
+        seen.append(update['update_id'])
+
+    async def run():
+        executor = UpdateExecutor(handle, workers=2)
+        for update in (message(1, 1), message(2, 1), message(3, 1), message(4, 2), message(5, 3)):
+            executor.submit(update)
+        await executor.close()
+
+    asyncio.run(run())
+    assert seen == [4, 5, 1, 2, 3]
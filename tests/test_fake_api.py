@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+
+import pytest
+
+from botup import codec
+from botup.api import Api
+from botup.bot import Bot
+from botup.exceptions import ApiError
+from botup.state_manager.base import DictStateManager
+from botup.testing.fake_api import FakeTelegramServer
+from botup.testing.load import generate_updates, run_load
+from botup.testing.replay import UpdateRecorder, MockApi, read_log, replay
+from botup.types import Message, User, Chat
+from botup.widget import Widget, Context
+
+
+class LoadRootWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_command_handler('/start', self.cmd_start)
+        dispatcher.register_callback_handler('none', self.clb_none)
+
+    @staticmethod
+    async def cmd_start(ctx: Context):
+        await ctx.api.send_message(chat_id=ctx.chat_id, text='hi')
+
+    @staticmethod
+    async def clb_none(ctx: Context):
+        await ctx.quick_callback_answer()
+
+
+class ReplayRootWidget(LoadRootWidget):
+    pass
+
+
+def test_fake_api_methods():
+    async def run():
+        async with FakeTelegramServer() as server:
+            async with Api('token', api_url=server.url) as api:
+                message = await api.send_message(chat_id=5, text='text')
+                me = await api.get_me()
+                chat = await api.get_chat(chat_id=5)
+                deleted = await api.delete_message(chat_id=5, message_id=message.message_id)
+            return server, message, me, chat, deleted
+
+    server, message, me, chat, deleted = asyncio.run(run())
+    assert isinstance(message, Message) and message.chat.id == 5 and message.text == 'text'
+    assert isinstance(me, User) and me.is_bot
+    assert isinstance(chat, Chat)
+    assert deleted is True
+    assert server.calls['sendMessage'] == 1
+
+
+def test_fake_api_rate_limit():
+    async def run():
+        async with FakeTelegramServer(rate_limit_rate=1, retry_after=3) as server:
+            async with Api('token', api_url=server.url) as api:
+                await api.send_message(chat_id=5, text='text')
+
+    with pytest.raises(ApiError) as e:
+        asyncio.run(run())
+    assert e.value.error_code == 429
+    assert e.value.retry_after == 3
+
+
+def test_load_generator_against_bot():
+    async def run():
+        async with FakeTelegramServer() as server:
+            bot = Bot(
+                token='token',
+                root=LoadRootWidget('LoadRootWidget'),
+                state_manager=DictStateManager(),
+                api=Api('token', api_url=server.url)
+            )
+            report = await run_load(bot.handle, generate_updates(50, chats=5, texts=('/start',), seed=1), concurrency=10)
+            await bot.close_session()
+            return server, report
+
+    server, report = asyncio.run(run())
+    assert report.count == 50
+    assert report.errors == 0
+    assert server.calls['sendMessage'] + server.calls['answerCallbackQuery'] == 50
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'updates.log.gz')
+    updates = list(generate_updates(20, chats=3, texts=('/start',), seed=2))
+
+    async def record():
+        handled = list()
+
+        class Target:
+            async def handle(self, update):
+                handled.append(update)
+
+        target = Target()
+        recorder = UpdateRecorder(path)
+        recorder.attach(target)
+        for update in updates:
+            await target.handle(update)
+        recorder.close()
+        return handled
+
+    assert asyncio.run(record()) == updates
+    assert [u for _, u in read_log(path)] == updates
+
+    async def run():
+        api = MockApi()
+        bot = Bot(
+            token='token',
+            root=ReplayRootWidget('ReplayRootWidget'),
+            state_manager=DictStateManager(),
+            api=api
+        )
+        report = await replay(bot.handle, path, speed=None)
+        await bot.close_session()
+        return api, report
+
+    api, report = asyncio.run(run())
+    assert report.errors == 0
+    assert sorted(update_id for update_id, _ in report.per_update) == [u['update_id'] for u in updates]
+    assert api.server.calls['sendMessage'] + api.server.calls['answerCallbackQuery'] == 20
+
+
+def test_read_log_skips_truncated_member(tmp_path):
+    path = str(tmp_path / 'updates.log.gz')
+    updates = [{'update_id': update_id} for update_id in range(6)]
+
+    recorder = UpdateRecorder(path, flush_every=2)
+    for update in updates[:4]:
+        recorder.record(update)
+    recorder.close()
+
+    # a crash in the middle of writing the next batch
+    with open(path, 'ab') as fd:
+        fd.write(gzip.compress(codec.dumps({'t': 0, 'u': {'update_id': 99}}).encode() + b'\n')[:15])
+
+    assert [u for _, u in read_log(path)] == updates[:4]
+
+    recorder = UpdateRecorder(path, flush_every=2)
+    for update in updates[4:]:
+        recorder.record(update)
+    recorder.close()
+
+    assert [u for _, u in read_log(path)] == updates
@@ -0,0 +1,72 @@
+import asyncio
+
+from aiohttp import ClientSession, web
+
+from botup import codec
+from botup.hosting import BotHost
+from botup.widget import Widget, Context
+
+
+class HostedWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_command_handler('/start', self.cmd_start)
+
+    @staticmethod
+    async def cmd_start(ctx: Context):
+        await ctx.state_manager.set(ctx.chat_id, 'started', ctx.api.token)
+
+
+def start_update(chat_id):
+    return {
+        'update_id': chat_id,
+        'message': {
+            'message_id': 1,
+            'date': 1,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            'text': '/start'
+        }
+    }
+
+
+def test_host_routes_by_token_without_shared_state():
+    async def run():
+        host = BotHost()
+        first = host.create_bot('first', HostedWidget())
+        second = host.create_bot('second', HostedWidget())
+
+        assert await host.handle('first', start_update(1))
+        assert not await host.handle('unknown', start_update(1))
+
+        result = (
+            await first._state_manager.get(1, 'started'),
+            await second._state_manager.get(1, 'started'),
+            first._api._session is second._api._session
+        )
+        await host.close()
+        return result
+
+    assert asyncio.run(run()) == ('first', None, True)
+
+
+def test_host_webhook_application():
+    async def run():
+        host = BotHost()
+        bot = host.create_bot('token', HostedWidget())
+        runner = web.AppRunner(host.application())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+
+        async with ClientSession() as session:
+            ok = await session.post(f'{url}/token', data=codec.dumps(start_update(5)))
+            missing = await session.post(f'{url}/unknown', data=codec.dumps(start_update(5)))
+            statuses = ok.status, missing.status
+
+        started = await bot._state_manager.get(5, 'started')
+        await runner.cleanup()
+        return statuses, started
+
+    assert asyncio.run(run()) == ((200, 404), 'token')
@@ -0,0 +1,62 @@
+import asyncio
+
+from botup.api import Api
+from botup.bot import Bot
+from botup.dispatcher import Dispatcher
+from botup.instrumentation import MetricsCollector, PARSE, MIDDLEWARE, ROUTING, HANDLER
+from botup.widget import Widget
+
+from tests import utils
+
+
+def test_dispatcher_instrumentation():
+    collector = MetricsCollector()
+    dispatcher = Dispatcher(instrumentation=collector)
+
+    async def middleware(ctx):
+        return False
+
+    async def start_handler(ctx):
+        pass
+
+    dispatcher.register_middleware(middleware)
+    dispatcher.register_command_handler('/start', start_handler)
+    asyncio.run(dispatcher.handle({
+        'update_id': 1,
+        'message': {
+            'message_id': 1,
+            'date': 1,
+            'chat': {'id': utils.USER_ID, 'type': 'private'},
+            'from': {'id': utils.USER_ID, 'is_bot': False, 'first_name': utils.USER_FIRST_NAME},
+            'text': '/start'
+        }
+    }))
+    asyncio.run(dispatcher.handle_context(utils.command_update_by_text('/unknown')))
+
+    snapshot = collector.snapshot()
+    assert snapshot[PARSE]['update']['count'] == 1
+    assert snapshot[MIDDLEWARE][middleware.__qualname__]['count'] == 2
+    assert snapshot[ROUTING]['message_command']['count'] == 1
+    assert snapshot[HANDLER][start_handler.__qualname__]['count'] == 1
+
+    text = collector.prometheus()
+    assert '# TYPE botup_handler_seconds histogram' in text
+    assert f'botup_handler_seconds_count{{name="{start_handler.__qualname__}"}} 1' in text
+    assert 'le="+Inf"' in text
+
+
+def test_bot_keeps_instrumentation_of_passed_api():
+    api_collector = MetricsCollector()
+    bot_collector = MetricsCollector()
+
+    async def run():
+        api = Api('token', instrumentation=api_collector)
+        kept = Bot('token', Widget('Root'), api=api)._api.instrumentation
+        bot = Bot('token', Widget('Root'), api=api, instrumentation=bot_collector)
+        own = Bot('token', Widget('Root'))
+        result = kept, api.instrumentation, bot.tree.root.dispatcher.instrumentation, own._api.instrumentation
+        await api.close_session()
+        await own.close_session()
+        return result
+
+    assert asyncio.run(run()) == (api_collector, bot_collector, bot_collector, None)
@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+
+from botup.bot import Bot
+from botup.exceptions import NavigationConflictError
+from botup.navigation import Navigation
+from botup.path_table import PathTable
+from botup.state_manager.base import DictStateManager
+from botup.state_manager.redis import RedisStateManager
+from botup.state_manager.unit_of_work import UnitOfWork
+from botup.tracing import RecordingTracer, Tracer, set_tracer
+from botup.widget import Widget, Context
+
+from tests import utils
+
+
+class NavChildWidget(Widget):
+    pass
+
+
+class NavRootWidget(Widget):
+    pass
+
+
+root = NavRootWidget('NavRoot', children=[NavChildWidget('NavChild', children=[NavChildWidget('NavGrandChild')])])
+
+
+def make_context(state_manager):
+    context = Context(utils.command_update_by_text('/start').update, None, root, state_manager)
+    context.chat_id = utils.USER_ID
+    return context
+
+
+def test_path_table():
+    table = PathTable.of(root)
+    assert table is PathTable.of(root)
+    assert len(table) == 3
+    assert table.resolve(None) is table.root
+    assert table.resolve('unknown') is table.root
+    node = table.resolve('NavRoot/NavChild/NavGrandChild')
+    assert node.widget.key == 'NavGrandChild'
+    assert table.resolve(node.id) is node
+    assert node.parent.parent is table.root
+
+
+def test_push_pop_stores_path_id():
+    state_manager = DictStateManager()
+
+    async def run():
+        nav = await Navigation.of(make_context(state_manager))
+        assert nav.current_widget is root
+        await nav.push('NavChild')
+        await nav.push('NavGrandChild')
+        stored = await state_manager.get_path(utils.USER_ID)
+        nav = await Navigation.of(make_context(state_manager))
+        assert nav.path() == 'NavRoot/NavChild/NavGrandChild'
+        assert stored == nav.path_id() and stored.startswith(PathTable.ID_PREFIX)
+        await nav.pop()
+        assert nav.current_widget.key == 'NavChild'
+        with pytest.raises(Exception):
+            await nav.push('NavRoot')
+
+    asyncio.run(run())
+
+
+def test_legacy_path_is_resolved():
+    state_manager = DictStateManager()
+
+    async def run():
+        await state_manager.set_path(utils.USER_ID, 'NavRoot/NavChild')
+        nav = await Navigation.of(make_context(state_manager))
+        return nav.current_widget.key
+
+    assert asyncio.run(run()) == 'NavChild'
+
+
+def redis_state_manager():
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisStateManager(redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+@pytest.mark.parametrize('make_state_manager', [DictStateManager, redis_state_manager])
+def test_concurrent_transition_conflicts(make_state_manager):
+    state_manager = make_state_manager()
+
+    async def run():
+        first = await Navigation.of(make_context(state_manager))
+        second = await Navigation.of(make_context(state_manager))
+        await first.push('NavChild')
+        await first.push('NavGrandChild')
+
+        with pytest.raises(NavigationConflictError):
+            await second.push('NavChild')
+
+        assert (await Navigation.of(make_context(state_manager))).current_widget.key == 'NavGrandChild'
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('make_state_manager', [DictStateManager, redis_state_manager])
+def test_reused_navigation_follows_context_version(make_state_manager):
+    state_manager = make_state_manager()
+
+    async def run():
+        context = make_context(state_manager)
+        first = await Navigation.of(context)
+        second = await Navigation.of(context)
+        await first.push('NavChild')
+        await second.push('NavChild')
+        await first.push('NavGrandChild')
+        return (await Navigation.of(make_context(state_manager))).current_widget.key
+
+    assert asyncio.run(run()) == 'NavGrandChild'
+
+
+@pytest.mark.parametrize('make_state_manager', [DictStateManager, redis_state_manager])
+def test_unit_of_work_checks_version_on_commit(make_state_manager):
+    state_manager = make_state_manager()
+
+    async def run():
+        unit_of_work = UnitOfWork(state_manager)
+        nav = await Navigation.of(make_context(unit_of_work))
+        await nav.push('NavChild')
+        await unit_of_work.set(utils.USER_ID, 'key', 'value')
+        await state_manager.set_path(utils.USER_ID, 'NavRoot')
+
+        with pytest.raises(NavigationConflictError):
+            await unit_of_work.commit()
+
+        assert await state_manager.get(utils.USER_ID, 'key') is None
+
+    asyncio.run(run())
+
+
+class CountingStateManager(DictStateManager):
+
+    def __init__(self):
+        super().__init__()
+        self.path_reads = 0
+
+    async def get_path_version(self, chat_id):
+        self.path_reads += 1
+        return await super().get_path_version(chat_id)
+
+
+class Exporter:
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+class StartWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_message_handler('go', self.start)
+
+    @staticmethod
+    async def start(ctx: Context):
+        nav = await Navigation.of(ctx)
+        assert nav.current_widget is ctx.root_widget
+        await nav.push('Next')
+        assert (await Navigation.of(ctx)).current_widget.key == 'Next'
+
+
+def test_bot_passes_resolved_path_to_navigation():
+    state_manager = CountingStateManager()
+    exporter = Exporter()
+    set_tracer(RecordingTracer(exporter))
+
+    async def run():
+        bot = Bot('token', StartWidget('Start', children=[NavChildWidget('Next')]), state_manager=state_manager)
+        await bot.handle({
+            'update_id': 1,
+            'message': {
+                'message_id': 1,
+                'date': 1,
+                'chat': {'id': utils.USER_ID, 'type': 'private'},
+                'from': {'id': utils.USER_ID, 'is_bot': False, 'first_name': utils.USER_FIRST_NAME},
+                'text': 'go'
+            }
+        })
+        await bot.close_session()
+        return await state_manager.get_path(utils.USER_ID)
+
+    try:
+        stored = asyncio.run(run())
+    finally:
+        set_tracer(Tracer())
+
+    assert state_manager.path_reads == 1
+    assert stored == PathTable.make_id('Start/Next')
+    assert [span.name for span in exporter.spans].count('navigation.of') == 1
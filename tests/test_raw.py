@@ -0,0 +1,66 @@
+import asyncio
+
+from botup.bot import Bot
+from botup.raw import get_update_types, get_context_chat_id, _update_types, _message_types
+from botup.constants.update_type import MESSAGE_COMMAND, MESSAGE_TEXT, MESSAGE_DOCUMENT
+from botup.types import BaseObject
+from botup.widget import Widget, Context
+from tests import utils
+
+ALL_TYPES = _update_types + tuple(t for _, t in _message_types) + (MESSAGE_COMMAND, MESSAGE_TEXT, MESSAGE_DOCUMENT)
+
+
+def to_raw(value):
+    if isinstance(value, BaseObject):
+        value = value.as_dict()
+
+    if isinstance(value, dict):
+        return {('from' if k == 'from_' else k): to_raw(v) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [to_raw(v) for v in value]
+
+    return value
+
+
+def fixtures():
+    yield utils.message_update_by_text('hello')
+    yield utils.command_update_by_text('/start')
+    yield utils.callback_update_by_data('data')
+    yield utils.inline_query_update_by_query('query')
+    yield utils.edited_message_update_by_text('hello')
+
+    for name in dir(utils):
+        if name.endswith('_update'):
+            yield getattr(utils, name)()
+
+
+def test_raw_update_types_match_context():
+    for context in fixtures():
+        raw = to_raw(context.update)
+        expected = {t for t in ALL_TYPES if getattr(context, f'is_{t}')}
+        assert set(get_update_types(raw)) == expected, raw
+
+
+class StickerlessWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_message_handler('hello', self.hello)
+
+    @staticmethod
+    async def hello(ctx: Context):
+        await ctx.state_manager.set(ctx.chat_id, 'hello', 'yes')
+
+
+def test_bot_skips_updates_without_handler():
+    sticker = to_raw(utils.sticker_update().update)
+    hello = to_raw(utils.message_update_by_text('hello').update)
+
+    async def run():
+        bot = Bot('token', StickerlessWidget())
+        await bot.handle(sticker)
+        await bot.handle(hello)
+        await bot.close_session()
+        return bot.skipped, await bot._state_manager.get(get_context_chat_id(hello), 'hello')
+
+    assert asyncio.run(run()) == (1, 'yes')
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from botup.exceptions import NavigationConflictError
+from botup.state_manager.redis import RedisStateManager, get_client
+
+
+def test_redis_client_per_event_loop():
+    async def client():
+        return get_client('redis://localhost')
+
+    async def same_loop():
+        return get_client('redis://localhost') is get_client('redis://localhost')
+
+    assert asyncio.run(same_loop())
+    assert asyncio.run(client()) is not asyncio.run(client())
+
+
+def make_state_manager():
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisStateManager(redis=fakeredis.FakeAsyncRedis(decode_responses=True), prefix='test:')
+
+
+def test_apply_and_get_many():
+    state_manager = make_state_manager()
+
+    async def run():
+        await state_manager.set(1, 'old', 'x', 'widget')
+        await state_manager.apply(1, {('widget', 'a'): '1', ('widget', 'old'): None}, 'path-1')
+        await state_manager.apply(1, {('botup-user', 'b'): '2'})
+        values = await state_manager.get_many(1, [('widget', 'a'), ('widget', 'old'), ('botup-user', 'b')])
+        return values, await state_manager.get_many(1, []), await state_manager.get_path_version(1)
+
+    assert asyncio.run(run()) == (['1', None, '2'], [], ('path-1', 1))
+
+
+def test_transition_checks_version():
+    state_manager = make_state_manager()
+
+    async def run():
+        assert await state_manager.transition(1, 'path-1', None, {('widget', 'a'): '1'}) == 1
+        assert await state_manager.transition(1, 'path-2', 1, {('widget', 'a'): None, ('widget', 'b'): 's:2'}) == 2
+
+        with pytest.raises(NavigationConflictError):
+            await state_manager.transition(1, 'path-3', 1, {('widget', 'b'): '3'})
+
+        with pytest.raises(NavigationConflictError):
+            await state_manager.transition(2, 'path-1', 5)
+
+        return await state_manager.get_path_version(1), await state_manager.get_many(1, [('widget', 'a'), ('widget', 'b')])
+
+    assert asyncio.run(run()) == (('path-2', 2), [None, 's:2'])
@@ -0,0 +1,73 @@
+import time
+
+from botup import codec
+from botup.bot import Bot
+from botup.raw import get_chat_id
+from botup.runner import Supervisor
+from botup.widget import Widget, Context
+
+
+class RunnerWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_command_handler('/start', self.cmd_start)
+
+    @staticmethod
+    async def cmd_start(ctx: Context):
+        pass
+
+
+def make_bot():
+    return Bot('token', RunnerWidget())
+
+
+def start_update(update_id, chat_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            'text': '/start'
+        }
+    }
+
+
+def test_raw_chat_id():
+    callback = {'update_id': 1, 'callback_query': {'id': '1', 'from': {'id': 7}, 'message': {'chat': {'id': -5}}}}
+    inline = {'update_id': 2, 'inline_query': {'id': '1', 'from': {'id': 8}, 'query': ''}}
+
+    assert get_chat_id(start_update(1, 42)) == 42
+    assert get_chat_id(callback) == -5
+    assert get_chat_id(inline) == 8
+    assert get_chat_id({'update_id': 3}) is None
+
+
+def test_supervisor_routes_chat_to_same_worker():
+    supervisor = Supervisor(make_bot, workers=4)
+
+    assert supervisor.get_index(123) == supervisor.get_index(123) == 123 % 4
+    assert {supervisor.get_index(None) for _ in range(4)} == {0, 1, 2, 3}
+
+
+def test_supervisor_workers_and_metrics():
+    supervisor = Supervisor(make_bot, workers=2, start_method='fork')
+    supervisor.start()
+
+    try:
+        for update_id in range(10):
+            supervisor.dispatch(codec.dumps(start_update(update_id, update_id % 3)).encode())
+
+        supervisor._processes[0].kill()
+        supervisor._processes[0].join()
+        supervisor.check_workers()
+        assert supervisor.restarts == 1
+        assert supervisor._processes[0].is_alive()
+    finally:
+        supervisor.stop()
+
+    time.sleep(0.1)
+    handled = supervisor.metrics().snapshot()['handler']
+    assert sum(value['count'] for value in handled.values()) <= 10
+    assert supervisor.metrics().snapshot()['parse']['update']['count'] >= 3
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from redis.asyncio import Redis
+
+from botup import codec
+from botup.stream import StreamConsumer, StreamProducer
+
+
+def test_partition_by_chat():
+    producer = StreamProducer(redis=Redis(), stream='updates', partitions=8)
+    message = {'update_id': 1, 'message': {'chat': {'id': 13}}}
+    callback = {'update_id': 2, 'callback_query': {'id': '1', 'from': {'id': 1}, 'message': {'chat': {'id': 13}}}}
+
+    assert producer.get_partition(message) == producer.get_partition(callback) == 13 % 8
+    assert producer.get_partition({'update_id': 10}) == 10 % 8
+    assert producer.get_stream_name(5) == 'updates:5'
+
+
+class FlakyBot:
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.handled = []
+
+    async def handle(self, update):
+        if update['update_id'] in self.failing:
+            raise Exception('Handling failed')
+        self.handled.append(update['update_id'])
+
+
+def _consumer(bot, redis, **kwargs):
+    return StreamConsumer(bot, redis=redis, stream='updates', partitions=1, consumer='worker', **kwargs)
+
+
+async def _publish(redis, *update_ids):
+    producer = StreamProducer(redis=redis, stream='updates', partitions=1)
+    for update_id in update_ids:
+        await producer.publish(codec.dumps({'update_id': update_id}))
+
+
+def test_consumer_acks_handled_entries():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        bot = FlakyBot()
+        consumer = _consumer(bot, redis)
+        await consumer.setup()
+        await _publish(redis, 1, 2)
+        await consumer._consume({'updates:0': '>'})
+        return bot.handled, (await redis.xpending('updates:0', 'botup'))['pending']
+
+    assert asyncio.run(run()) == ([1, 2], 0)
+
+
+def test_consumer_keeps_failed_entries_pending():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        bot = FlakyBot(failing={2})
+        consumer = _consumer(bot, redis)
+        await consumer.setup()
+        await _publish(redis, 1, 2, 3)
+        await consumer._consume({'updates:0': '>'})
+        return bot.handled, consumer.failed, (await redis.xpending('updates:0', 'botup'))['pending']
+
+    assert asyncio.run(run()) == ([1, 3], 1, 1)
+
+
+def test_consumer_moves_failed_entries_to_dead_letter():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        consumer = _consumer(FlakyBot(failing={1}), redis, dead_letter='updates:dead', max_deliveries=1)
+        await consumer.setup()
+        await _publish(redis, 1)
+        await consumer._consume({'updates:0': '>'})
+        dead = await redis.xrange('updates:dead')
+        return (await redis.xpending('updates:0', 'botup'))['pending'], [codec.loads(f['update']) for _, f in dead]
+
+    assert asyncio.run(run()) == (0, [{'update_id': 1}])
+
+
+def test_consumer_recovers_all_pending_entries():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        bot = FlakyBot(failing={2})
+        consumer = _consumer(bot, redis, batch_size=2)
+        await consumer.setup()
+        await _publish(redis, 1, 2, 3, 4, 5)
+        # delivered to the consumer before it crashed, never acked
+        await redis.xreadgroup('botup', 'worker', {'updates:0': '>'})
+        await consumer.recover()
+        return bot.handled, (await redis.xpending('updates:0', 'botup'))['pending']
+
+    assert asyncio.run(run()) == ([1, 3, 4, 5], 1)
+
+
+def test_consumer_gives_up_after_max_deliveries():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        bot = FlakyBot(failing={1})
+        consumer = _consumer(bot, redis, claim_idle=0, max_deliveries=3)
+        await consumer.setup()
+        await _publish(redis, 1, 2)
+        await consumer._consume({'updates:0': '>'})
+        pending = [(await redis.xpending('updates:0', 'botup'))['pending']]
+
+        for _ in range(3):
+            await consumer._claim()
+            pending.append((await redis.xpending('updates:0', 'botup'))['pending'])
+
+        return bot.handled, consumer.failed, pending
+
+    assert asyncio.run(run()) == ([2], 3, [1, 1, 0, 0])
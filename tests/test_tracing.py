@@ -0,0 +1,57 @@
+import asyncio
+
+from botup import codec
+from botup.tracing import RecordingTracer, SpanExporter, JsonLinesExporter, Tracer, get_tracer, set_tracer
+
+
+class ListExporter(SpanExporter):
+
+    def __init__(self):
+        self.spans = list()
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_nested_spans():
+    exporter = ListExporter()
+    tracer = RecordingTracer(exporter)
+
+    async def child(n):
+        with tracer.span('child', n=n):
+            await asyncio.sleep(0)
+
+    async def run():
+        with tracer.span('parent', update_id=1) as span:
+            await asyncio.gather(child(1), child(2))
+            span.set_attribute('chat_id', 2)
+
+    asyncio.run(run())
+    parent = exporter.spans[-1]
+    children = exporter.spans[:-1]
+    assert parent.name == 'parent'
+    assert parent.attributes == {'update_id': 1, 'chat_id': 2}
+    assert parent.parent_id is None
+    assert [c.attributes['n'] for c in children] == [1, 2]
+    assert all(c.parent_id == parent.span_id and c.trace_id == parent.trace_id for c in children)
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    exporter = JsonLinesExporter(str(path))
+    set_tracer(RecordingTracer(exporter))
+
+    try:
+        try:
+            with get_tracer().span('failing'):
+                raise ValueError('boom')
+        except ValueError:
+            pass
+    finally:
+        set_tracer(Tracer())
+        exporter.close()
+
+    record = codec.loads(path.read_text().strip())
+    assert record['name'] == 'failing'
+    assert record['status'] == 'error'
+    assert record['attributes']['error'] == 'ValueError: boom'
@@ -0,0 +1,194 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from botup.bot import Bot
+from botup.navigation import Navigation
+from botup.state_manager.base import DictStateManager
+from botup.testing.replay import MockApi
+from botup.widget import Widget, Context
+from botup.widgets.date_picker import DatePicker
+
+
+class CountingStateManager(DictStateManager):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+
+    async def get(self, chat_id, key, section='botup-user'):
+        self.calls['get'] += 1
+        return await super().get(chat_id, key, section)
+
+    async def get_many(self, chat_id, keys):
+        self.calls['get_many'] += 1
+        return [self._get_user_dict(chat_id, section).get(key) for section, key in keys]
+
+    async def apply(self, chat_id, values, path=None):
+        self.calls['apply'] += 1
+        await super().apply(chat_id, values, path)
+
+
+class Child(Widget):
+    pass
+
+
+class Root(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_message_handler('go', self.go)
+        dispatcher.register_message_handler('fail', self.fail)
+
+    @staticmethod
+    async def go(ctx: Context):
+        await ctx.state_manager.set(ctx.chat_id, 'a', '1')
+        await ctx.state_manager.set(ctx.chat_id, 'b', '2')
+        await ctx.state_manager.delete(ctx.chat_id, 'old')
+        assert await ctx.state_manager.get(ctx.chat_id, 'a') == '1'
+        assert await ctx.state_manager.get(ctx.chat_id, 'missing') is None
+        assert await ctx.state_manager.get(ctx.chat_id, 'missing') is None
+        nav = await Navigation.of(ctx)
+        await nav.push('Child')
+        assert (await Navigation.of(ctx)).current_widget.key == 'Child'
+
+    @staticmethod
+    async def fail(ctx: Context):
+        await ctx.state_manager.set(ctx.chat_id, 'a', 'broken')
+        raise ValueError('boom')
+
+
+def text_update(text):
+    return {
+        'update_id': 1,
+        'message': {
+            'message_id': 1,
+            'date': 1,
+            'chat': {'id': 1, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            'text': text
+        }
+    }
+
+
+def test_unit_of_work_flushes_once():
+    state_manager = CountingStateManager()
+
+    async def run():
+        await state_manager.set(1, 'old', 'x')
+        bot = Bot('token', Root(children=[Child()]), state_manager=state_manager, unit_of_work=True)
+        await bot.handle(text_update('go'))
+        await bot.close_session()
+
+    asyncio.run(run())
+    assert state_manager.calls == {'get': 1, 'apply': 1}
+    assert state_manager._data['botup-user']['1'] == {'a': '1', 'b': '2'}
+    assert state_manager._data['botup']['1']['path'].startswith('~')
+
+
+def test_unit_of_work_rolls_back():
+    state_manager = CountingStateManager()
+
+    async def run():
+        bot = Bot('token', Root(children=[Child()]), state_manager=state_manager, unit_of_work=True)
+        try:
+            await bot.handle(text_update('fail'))
+        finally:
+            await bot.close_session()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+    assert state_manager.calls['apply'] == 0
+    assert asyncio.run(state_manager.get(1, 'a')) is None
+
+
+def callback_update(data):
+    return {
+        'update_id': 2,
+        'callback_query': {
+            'id': '1',
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            'message': {'message_id': 5, 'date': 1, 'chat': {'id': 1, 'type': 'private'}},
+            'chat_instance': '1',
+            'data': data
+        }
+    }
+
+
+@pytest.mark.parametrize('unit_of_work', [False, True])
+def test_declared_state_keys_are_prefetched(unit_of_work):
+    state_manager = CountingStateManager()
+    picker = DatePicker()
+    root = Root(children=[picker])
+
+    async def run():
+        bot = Bot('token', root, state_manager=state_manager, api=MockApi(), unit_of_work=unit_of_work)
+        node = next(node for node in bot.tree.paths.nodes() if node.widget is picker)
+        await state_manager.set_path(1, node.id)
+        await state_manager.set(1, 'value', '2024-06', 'botup_date_picker')
+        await state_manager.set(1, 'message_id', '5', 'botup_date_picker')
+        await bot.handle(callback_update('right'))
+        await bot.close_session()
+        return bot._api.server.calls['editMessageReplyMarkup']
+
+    assert asyncio.run(run()) == 1
+    assert state_manager.calls['get'] == 0
+    assert state_manager.calls['get_many'] == 1
+    assert asyncio.run(state_manager.get(1, 'value', 'botup_date_picker')) == '2024-07'
+
+
+class OverlapStateManager(CountingStateManager):
+
+    def __init__(self):
+        super().__init__()
+        self.reading = asyncio.Event()
+
+    async def get_path_version(self, chat_id):
+        # only returns once the batched read is in flight
+        await asyncio.wait_for(self.reading.wait(), 1)
+        return await super().get_path_version(chat_id)
+
+    async def get_many(self, chat_id, keys):
+        self.reading.set()
+        return await super().get_many(chat_id, keys)
+
+
+def test_prefetch_runs_alongside_path_read():
+    state_manager = OverlapStateManager()
+    picker = DatePicker()
+    root = Root(children=[Child(), picker])
+
+    async def run():
+        bot = Bot('token', root, state_manager=state_manager, api=MockApi())
+        node = next(node for node in bot.tree.paths.nodes() if node.widget is picker)
+        await state_manager.set_path(1, node.id)
+        await bot.handle(callback_update('none'))
+        await bot.close_session()
+        return bot._api.server.calls['answerCallbackQuery']
+
+    assert asyncio.run(run()) == 1
+    assert state_manager.calls['get_many'] == 1
+
+
+class ContextRoot(Root):
+
+    def build(self, dispatcher):
+        dispatcher.register_message_handler('go', self.remember)
+
+    async def remember(self, ctx: Context):
+        self.state_manager = ctx.state_manager
+
+
+def test_no_prefetch_for_update_types_without_state_keys():
+    state_manager = CountingStateManager()
+    root = ContextRoot(children=[DatePicker()])
+
+    async def run():
+        bot = Bot('token', root, state_manager=state_manager, api=MockApi())
+        await bot.handle(text_update('go'))
+        await bot.close_session()
+
+    asyncio.run(run())
+    assert not state_manager.calls
+    assert root.state_manager is state_manager
@@ -0,0 +1,70 @@
+import pytest
+
+from botup.exceptions import WidgetTreeError
+from botup.widget import Widget
+from botup.widget_tree import WidgetTree
+
+
+async def noop(ctx):
+    pass
+
+
+class TreeWidget(Widget):
+
+    def build(self, dispatcher):
+        dispatcher.register_command_handler('/start', noop)
+        dispatcher.register_callback_handler('data', noop)
+
+
+def test_compile_tree():
+    leaf = TreeWidget('TreeLeaf')
+    child = TreeWidget('TreeChild', children=[leaf])
+    root = TreeWidget('TreeRoot', children=[child])
+    tree = WidgetTree(root)
+
+    assert tree.stats == {'widgets': 3, 'paths': 3, 'max_depth': 3, 'handlers': 6, 'middlewares': 0}
+    assert leaf.parent is child and child.parent is root and root.parent is None
+    assert root.is_children_by_key('TreeChild') and not root.is_children_by_key('TreeLeaf')
+    assert tree.get('TreeLeaf') is leaf
+    assert root.dispatcher.frozen
+
+    with pytest.raises(Exception):
+        root.dispatcher.register_message_handler('text', noop)
+
+
+def test_shared_widget():
+    shared = TreeWidget('TreeShared')
+    root = TreeWidget('TreeSharedRoot', children=[
+        TreeWidget('TreeSharedA', children=[shared]),
+        TreeWidget('TreeSharedB', children=[shared])
+    ])
+    tree = WidgetTree(root)
+
+    assert tree.stats['widgets'] == 4 and tree.stats['paths'] == 5
+    assert tree.get('TreeShared') is shared and shared.dispatcher.frozen
+    assert tree.paths.resolve('TreeSharedRoot/TreeSharedB/TreeShared').widget is shared
+    assert tree.paths.resolve('TreeSharedRoot/TreeSharedA/TreeShared').widget is shared
+
+
+def test_reject_cycle():
+    child = TreeWidget('TreeCycleChild')
+    root = TreeWidget('TreeCycleRoot', children=[child])
+    child.children.append(root)
+
+    with pytest.raises(WidgetTreeError):
+        WidgetTree(root)
+
+
+def test_reject_key_collision():
+    root = TreeWidget('TreeCollisionRoot', children=[
+        TreeWidget('TreeCollisionA', children=[TreeWidget('TreeCollision')]),
+        TreeWidget('TreeCollisionB', children=[TreeWidget('TreeCollision')])
+    ])
+
+    with pytest.raises(WidgetTreeError):
+        WidgetTree(root)
+
+
+def test_reject_invalid_key():
+    with pytest.raises(WidgetTreeError):
+        WidgetTree(TreeWidget('Tree/Invalid'))
@@ -38,7 +38,9 @@ def command_update_by_text(text):
                                                               'type': 'private',
                                                               'username': USER_USERNAME},
                                                      'date': 1579426411,
-                                                     'entities': [{'length': 6, 'offset': 0, 'type': 'bot_command'}],
+                                                     'entities': [{'length': len(text.split()[0]),
+                                                                   'offset': 0,
+                                                                   'type': 'bot_command'}],
                                                      'from': {'first_name': USER_FIRST_NAME,
                                                               'id': USER_ID,
                                                               'is_bot': False,